@@ -1,6 +1,12 @@
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_init, task_prerun, task_postrun, before_task_publish
 from dash import CeleryManager
+from db_manager.engine_registry import engine_registry, STATS_INTERVAL
+from cache_manager.cache_manager import CacheManager as cm, LEASE_TTL
 import os
+import threading
+import time
 
 redis_host = "{}".format(os.getenv("REDIS_SERVICE_HOST", "redis-cache"))
 redis_port = "{}".format(os.getenv("REDIS_SERVICE_PORT", "6379"))
@@ -15,6 +21,143 @@ celery_app = Celery(
     backend=REDIS_URL,
 )
 
-celery_app.conf.update(task_time_limit=84600, task_acks_late=True, task_track_started=True)
+# workers reserve one task per process at a time, so a task queued
+# behind a long one can still be picked up by another worker.
+celery_app.conf.update(
+    task_time_limit=84600, task_acks_late=True, task_track_started=True, worker_prefetch_multiplier=1
+)
 
 celery_manager = CeleryManager(celery_app=celery_app)
+
+# off-peak hours (UTC, crontab syntax) in which the most requested repos
+# are prewarmed by the beat service, empty disables prewarming
+PREWARM_HOURS = os.getenv("PREWARM_HOURS", "3")
+
+if PREWARM_HOURS:
+    celery_app.conf.beat_schedule = {
+        "prewarm-cache": {
+            "task": "pages.index.index_callbacks.prewarm_cache",
+            "schedule": crontab(minute=0, hour=PREWARM_HOURS),
+            "options": {"queue": "data_bulk"},
+        },
+    }
+
+
+@worker_process_init.connect
+def reset_db_engines(**kwargs):
+    """
+    Drops the database engines a forked worker process inherited,
+    so that each process opens and pools its own connections.
+    """
+    engine_registry.dispose(close=False)
+
+
+@task_postrun.connect
+def log_db_stats(**kwargs):
+    """
+    Logs the worker process's connection pool waits and prepared
+    statement counts every STATS_INTERVAL seconds.
+    """
+    engine_registry.log_stats(STATS_INTERVAL)
+
+
+# upper bounds in seconds of the queue wait histogram
+QUEUE_WAIT_BUCKETS = [1, 5, 30, 120, 600]
+
+
+@before_task_publish.connect
+def stamp_enqueued(headers=None, routing_key=None, **kwargs):
+    """
+    Records when and to which queue a task was sent, in its message headers.
+    """
+    headers.setdefault("enqueued_at", time.time())
+    headers.setdefault("queue", routing_key)
+
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs):
+    """
+    Records how long a task waited in its queue, under
+    'metrics:queue_wait:<queue>', to size the workers of each queue,
+    and the queue's longest recent wait, which queued leases outlive.
+    """
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    queue = getattr(task.request, "queue", None)
+    if enqueued_at is None or queue is None:
+        return
+
+    wait = max(0.0, time.time() - enqueued_at)
+    bucket = next((f"le_{b}s" for b in QUEUE_WAIT_BUCKETS if wait <= b), f"gt_{QUEUE_WAIT_BUCKETS[-1]}s")
+    cache = cm()
+    cache.record_metrics(f"queue_wait:{queue}", {"tasks": 1, "wait_seconds": float(wait), bucket: 1})
+    cache.record_queue_wait(queue, wait)
+
+
+# stop events of the lease heartbeats of running query tasks, by task id
+_heartbeats = {}
+
+
+def _leased_repos(task, args):
+    """
+    (private)
+    Repos a task holds in-flight leases for, see CacheManager.claim_inflight.
+    Only query tasks whose first argument is a list of repos hold leases.
+    """
+    if not task.name.startswith("queries.") or not args or not isinstance(args[0], list):
+        return None
+    return args[0]
+
+
+def _leased_queries(task):
+    """
+    (private)
+    Queries a task holds in-flight leases under, all the
+    queries it caches in the case of a shared scan.
+    """
+    return getattr(task, "cached_queries", None) or [task]
+
+
+@task_prerun.connect
+def start_lease_heartbeat(task_id=None, task=None, args=None, **kwargs):
+    """
+    Keeps renewing the in-flight leases of a running query task,
+    so that requests for the same repos keep waiting on it. If the
+    worker dies, the heartbeat stops and the leases expire.
+    """
+    repos = _leased_repos(task, args)
+    if repos is None:
+        return
+
+    # fanned out queries are claimed under their group's id
+    job_id = task.request.group or task_id
+    stop = threading.Event()
+    _heartbeats[task_id] = stop
+
+    def heartbeat():
+        cache = cm()
+        while True:
+            for f in _leased_queries(task):
+                cache.renew_inflight(f, repos, job_id)
+            if stop.wait(LEASE_TTL / 3):
+                break
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+
+@task_postrun.connect
+def release_leases(task_id=None, task=None, args=None, state=None, **kwargs):
+    """
+    Stops the lease heartbeat of a finished query task and releases its
+    leases, so the next request for the repos doesn't wait on it.
+    """
+    stop = _heartbeats.pop(task_id, None)
+    if stop is not None:
+        stop.set()
+
+    repos = _leased_repos(task, args)
+    if repos is None or state == "RETRY":
+        return
+
+    cache = cm()
+    for f in _leased_queries(task):
+        cache.release_inflight(f, repos, task.request.group or task_id)
@@ -0,0 +1,327 @@
+import os
+import time
+import logging
+
+# Redis names of the side index kept next to the cached blobs.
+SIZE_INDEX = "cache_policy:size"
+QUERY_INDEX = "cache_policy:query"
+QUERY_BYTES_INDEX = "cache_policy:query_bytes"
+RANK_INDEX = "cache_policy:rank"
+GENERATION_INDEX = "cache_policy:generation"
+
+# running sum of the sizes in SIZE_INDEX, so writes don't have to add them all up
+TOTAL_BYTES = "cache_policy:total_bytes"
+
+# last size written per (query, repo), kept after the entry expires
+# to estimate what re-running the query for the repo costs.
+COST_INDEX = "cache_policy:cost"
+
+
+class CachePolicy:
+    """
+    Expiry, size accounting, and eviction for the (query, repo)
+    entries that CacheManager stores in Redis.
+
+    Every entry written through CacheManager gets a per-query TTL and
+    is recorded in a side index that holds its size in bytes, the query
+    it belongs to, and a rank used for eviction. When the bytes stored
+    exceed the configured budget, whole entries are evicted in rank order.
+
+    Configuration (environment):
+    -----------------------------
+        CACHE_DEFAULT_TTL : seconds an entry lives without being read, 0 for no expiry. Default 7 days.
+        CACHE_TTL_<QUERY> : TTL for one query, e.g. CACHE_TTL_COMMITS_QUERY.
+        CACHE_MAX_BYTES : budget for cached bytes, 0 for unbounded. Default 0.
+        CACHE_EVICTION_POLICY : 'lru' (least recently read) or 'lfu' (least frequently read). Default 'lru'.
+        CACHE_PINNED_REPOS : comma separated repo_ids that never expire or get evicted.
+
+    Attributes:
+    -----------
+        _redis : (private) Redis object shared with CacheManager
+
+    Methods:
+    --------
+        ttl(func):
+            Returns TTL in seconds for entries of func, None if they don't expire.
+
+        is_pinned(repo):
+            Whether repo's entries are kept resident.
+
+        record_set(func, [repo], [h], [size]):
+            Updates the side index after entries are written.
+
+        record_access(func, [repo], [h]):
+            Updates eviction rank and slides TTL after entries are read.
+
+        costs(func, [repo]):
+            Returns the last size written per repo, None where unknown.
+
+        enforce_budget(protect):
+            Evicts entries until bytes stored fits the budget.
+
+        footprint():
+            Returns bytes stored overall and per query.
+    """
+
+    def __init__(self, redis_conn):
+        self._redis = redis_conn
+
+        self.default_ttl = int(os.getenv("CACHE_DEFAULT_TTL", 7 * 24 * 60 * 60))
+        self.max_bytes = int(os.getenv("CACHE_MAX_BYTES", 0))
+        self.eviction_policy = os.getenv("CACHE_EVICTION_POLICY", "lru").lower()
+        self.pinned_repos = {int(r) for r in os.getenv("CACHE_PINNED_REPOS", "").split(",") if r.strip().isdigit()}
+
+        if self.eviction_policy not in ("lru", "lfu"):
+            logging.error(f"CACHE_POLICY: UNKNOWN EVICTION POLICY {self.eviction_policy}, USING LRU")
+            self.eviction_policy = "lru"
+
+    def ttl(self, func):
+        """Returns how long entries of func live without being read.
+
+        Args:
+            func (function): Query function used
+
+        Returns:
+            int | None: TTL in seconds, None if entries don't expire.
+        """
+        ttl = int(os.getenv(f"CACHE_TTL_{func.__name__.upper()}", self.default_ttl))
+        return ttl if ttl > 0 else None
+
+    def is_pinned(self, repo):
+        """Whether repo's entries are kept resident regardless of TTL and budget.
+
+        Args:
+            repo (int): repo_id of repo
+
+        Returns:
+            boolean: repo is pinned
+        """
+        return repo in self.pinned_repos
+
+    def record_set(self, func, repos, hs, sizes):
+        """Records the size and owning query of newly written entries
+        and gives them a fresh eviction rank.
+
+        Args:
+            func (function): Query function used
+            repos (list[int]): repo_ids the entries were written for
+            hs (list[str]): keys of the entries
+            sizes (list[int]): bytes written at each key
+        """
+
+        # the running total has to exist before it's incremented
+        self.total_bytes()
+
+        # sizes of the values being replaced, so per-query totals stay correct
+        old_sizes = self._redis.hmget(SIZE_INDEX, hs)
+
+        delta = 0
+        pipe = self._redis.pipeline(transaction=True)
+        for r, h, size, old in zip(repos, hs, sizes, old_sizes):
+            delta += size - int(old or 0)
+            pipe.hset(SIZE_INDEX, h, size)
+            pipe.hset(QUERY_INDEX, h, func.__name__)
+
+            # pinned entries are never candidates for eviction
+            if self.is_pinned(r):
+                pipe.zrem(RANK_INDEX, h)
+            elif self.eviction_policy == "lru":
+                pipe.zadd(RANK_INDEX, {h: time.time()})
+            else:
+                pipe.zadd(RANK_INDEX, {h: 1})
+
+        pipe.hincrby(QUERY_BYTES_INDEX, func.__name__, delta)
+        pipe.incrby(TOTAL_BYTES, delta)
+        pipe.hset(f"{COST_INDEX}:{func.__name__}", mapping={str(r): size for r, size in zip(repos, sizes)})
+        pipe.execute()
+
+    def record_access(self, func, repos, hs):
+        """Updates the eviction rank of entries that were read and
+        restarts their TTL, so entries that keep being read stay resident.
+
+        Args:
+            func (function): Query function used
+            repos (list[int]): repo_ids the entries were read for
+            hs (list[str]): keys of the entries
+        """
+        ttl = self.ttl(func)
+        now = time.time()
+
+        pipe = self._redis.pipeline(transaction=False)
+        for r, h in zip(repos, hs):
+            if self.is_pinned(r):
+                continue
+
+            # 'xx' only updates entries that are still indexed
+            if self.eviction_policy == "lru":
+                pipe.zadd(RANK_INDEX, {h: now}, xx=True)
+            else:
+                pipe.zadd(RANK_INDEX, {h: 1}, xx=True, incr=True)
+
+            if ttl:
+                pipe.expire(h, ttl)
+        pipe.execute()
+
+    def costs(self, func, repos):
+        """Bytes last written for each repo's entry of func,
+        a proxy for how expensive the query is for that repo.
+
+        Args:
+            func (function): Query function used
+            repos (list[int]): repo_ids
+
+        Returns:
+            list[int | None]: bytes per repo, None for repos never written.
+        """
+        if not repos:
+            return []
+
+        sizes = self._redis.hmget(f"{COST_INDEX}:{func.__name__}", [str(r) for r in repos])
+        return [None if s is None else int(s) for s in sizes]
+
+    def _drop(self, hs):
+        """
+        (private)
+        Removes entries from the side index and returns
+        how many bytes they accounted for.
+
+        Args:
+        -----
+            hs (list[str]): keys of the entries
+
+        Returns:
+        --------
+            int: bytes released
+        """
+        if not hs:
+            return 0
+
+        # the running total has to exist before it's decremented
+        self.total_bytes()
+
+        sizes = self._redis.hmget(SIZE_INDEX, hs)
+        queries = self._redis.hmget(QUERY_INDEX, hs)
+
+        released = 0
+        pipe = self._redis.pipeline(transaction=True)
+        for h, size, q in zip(hs, sizes, queries):
+            size = int(size or 0)
+            released += size
+            if q is not None:
+                pipe.hincrby(QUERY_BYTES_INDEX, q, -size)
+        pipe.decrby(TOTAL_BYTES, released)
+        pipe.hdel(SIZE_INDEX, *hs)
+        pipe.hdel(QUERY_INDEX, *hs)
+        pipe.hdel(GENERATION_INDEX, *hs)
+        pipe.zrem(RANK_INDEX, *hs)
+        pipe.execute()
+
+        return released
+
+    def prune_expired(self):
+        """Removes index entries whose keys have expired.
+
+        Returns:
+            int: bytes that were accounted for by expired keys
+        """
+        hs = list(self._redis.hkeys(SIZE_INDEX))
+        if not hs:
+            return 0
+
+        pipe = self._redis.pipeline(transaction=False)
+        for h in hs:
+            pipe.exists(h)
+        gone = [h for h, n in zip(hs, pipe.execute()) if not n]
+
+        return self._drop(gone)
+
+    def total_bytes(self):
+        """Bytes currently accounted for in the side index, kept up to
+        date by 'record_set' and '_drop'.
+
+        An index written before the running total existed is added up
+        once to start it.
+
+        Returns:
+            int: bytes stored
+        """
+        total = self._redis.get(TOTAL_BYTES)
+        if total is not None:
+            return int(total)
+
+        total = sum(int(v) for v in self._redis.hvals(SIZE_INDEX))
+        self._redis.set(TOTAL_BYTES, total, nx=True)
+        return int(self._redis.get(TOTAL_BYTES) or total)
+
+    def enforce_budget(self, protect=()):
+        """Evicts whole (query, repo) entries, lowest rank first,
+        until the bytes stored fit in CACHE_MAX_BYTES.
+
+        Args:
+            protect (list[str]): keys that must not be evicted,
+                e.g. the ones that were just written.
+
+        Returns:
+            int: number of entries evicted
+        """
+        if not self.max_bytes:
+            return 0
+
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+
+        # expired entries are the cheapest to give back
+        total -= self.prune_expired()
+
+        protect = set(protect)
+        skipped = {}
+        evicted = 0
+        while total > self.max_bytes:
+            popped = self._redis.zpopmin(RANK_INDEX, count=16)
+            if not popped:
+                break
+
+            victims = []
+            for h, score in popped:
+                h = h.decode("utf-8") if isinstance(h, bytes) else h
+                if h in protect:
+                    skipped[h] = score
+                    continue
+                victims.append(h)
+
+            if victims:
+                self._redis.delete(*victims)
+                total -= self._drop(victims)
+                evicted += len(victims)
+
+        # put protected entries back with the rank they had
+        if skipped:
+            self._redis.zadd(RANK_INDEX, skipped)
+
+        if evicted:
+            logging.warning(f"CACHE_POLICY: EVICTED {evicted} ENTRIES, {total} BYTES STORED")
+
+        return evicted
+
+    def footprint(self):
+        """Bytes stored overall and per query, for sizing redis-cache.
+
+        Returns:
+            dict: {total_bytes, max_bytes, num_entries, per_query, used_memory}
+        """
+        self.prune_expired()
+
+        per_query = {
+            (k.decode("utf-8") if isinstance(k, bytes) else k): int(v)
+            for k, v in self._redis.hgetall(QUERY_BYTES_INDEX).items()
+        }
+
+        return {
+            "total_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "num_entries": self._redis.hlen(SIZE_INDEX),
+            "per_query": per_query,
+            # what the Redis process itself reports, including overhead
+            "used_memory": self._redis.info("memory").get("used_memory"),
+        }
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Process-local LRU of decoded cache entries, bounded by bytes.
+
+    Entries are Arrow Tables decoded from the feather blobs in Redis,
+    stored under the entry's Redis key together with the generation
+    stamp the blob was written with. A lookup only hits if the stamp
+    still matches the one in Redis, so a rewritten entry is never served
+    from a stale copy.
+
+    Tables are immutable, so one decoded copy can be shared by every
+    CacheManager and callback in the process.
+
+    Attributes:
+    -----------
+        max_bytes : budget for decoded bytes held, 0 disables the cache
+        _entries : (private) OrderedDict of key -> (generation, table, nbytes), oldest first
+        _nbytes : (private) bytes currently held
+        _lock : (private) guards _entries and _nbytes
+
+    Methods:
+    --------
+        get(h, gen):
+            Returns the table held for key h at generation gen, None if there isn't one.
+
+        put(h, gen, table):
+            Holds table for key h at generation gen, evicting least recently used tables to fit.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, h, gen):
+        """Returns the table held for key h if it was decoded
+        from the blob written at generation gen.
+
+        Args:
+            h (str): Redis key of the entry
+            gen (str): generation stamp of the entry in Redis
+
+        Returns:
+            pa.Table | None: decoded entry, None if not held or outdated.
+        """
+        with self._lock:
+            entry = self._entries.get(h)
+            if entry is None or entry[0] != gen:
+                return None
+
+            self._entries.move_to_end(h)
+            return entry[1]
+
+    def put(self, h, gen, table):
+        """Holds table for key h at generation gen, replacing
+        any older generation of the same key.
+
+        Args:
+            h (str): Redis key of the entry
+            gen (str): generation stamp the table was decoded at
+            table (pa.Table): decoded entry
+        """
+        size = table.nbytes
+
+        # tables that could never fit would only flush everything else
+        if not self.max_bytes or size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(h, None)
+            if old is not None:
+                self._nbytes -= old[2]
+
+            self._entries[h] = (gen, table, size)
+            self._nbytes += size
+
+            while self._nbytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_size
@@ -5,10 +5,23 @@ import pandas as pd
 import numpy as np
 import sqlalchemy as salc
 import os
+import io
 import logging
 import sys
 import requests
+import threading
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import time
+import re
+import hashlib
 from sqlalchemy.exc import SQLAlchemyError
+from db_manager.engine_registry import engine_registry
+
+# named bind parameters (':name') in query text, as SQLAlchemy's text() finds them
+_BIND_PARAM = re.compile(r"(?<![:\w\x5c]):(\w+)(?!:)")
 
 
 class AugurManager:
@@ -41,15 +54,44 @@ class AugurManager:
             Schema credential to Augur database.
             The target schema of the database we want to access.
 
+        batch_size : int
+            Rows fetched at a time by stream_query.
+
+        copy_block_size : int
+            Bytes of COPY output parsed at a time by stream_query.
+
     Methods:
     --------
         get_engine():
             Connects to Augur databse with supplied credentials and
-            returns engine object.
+            returns engine object, shared by all AugurManagers in the process.
 
-        run_query(query_string):
+        run_query(query_string, column_types, params):
             Runs a SQL-query against Augur database and returns resulting
             Pandas dataframe.
+
+        stream_query(query_string, batch_size, column_types, params):
+            Runs a SQL-query against Augur database through a server-side
+            cursor and yields the result in Pandas dataframes of batch_size rows.
+
+        stream_query_groups(query_string, key, keys, batch_size, column_types, params):
+            Like stream_query, but yields the rows of one value of 'key' at a time
+            for a query ordered by 'key'.
+
+        planning_time(query_string, params):
+            Returns how long Postgres takes to plan the prepared query.
+
+        Queries that declare the Arrow types of their result columns
+        ('column_types') are read with COPY ... TO STDOUT and parsed by
+        Arrow's CSV reader instead of row by row, falling back to the
+        cursor if that fails.
+
+        Values are passed to queries as bind parameters ('params', written
+        ':name' in the query), e.g. the selected repos as one array with
+        'repo_id = ANY(:repo_ids)'. The query text is then the same for
+        every selection, so 'run_query' prepares it once per pooled
+        connection and Postgres can reuse its plan. COPY and server-side
+        cursors can't run prepared statements, they bind the values client-side.
     """
 
     def __init__(self, handles_oauth=False):
@@ -57,6 +99,13 @@ class AugurManager:
         self.engine = None
         self.initial_search_option = None
 
+        # rows held in memory at a time when streaming query results
+        self.batch_size = int(os.getenv("AUGUR_QUERY_BATCH_SIZE", 10000))
+        self.copy_block_size = int(os.getenv("AUGUR_COPY_BLOCK_SIZE", 4 * 1024 * 1024))
+
+        # poolers in transaction mode (e.g. pgbouncer) don't keep prepared statements
+        self.prepare_statements = os.getenv("AUGUR_PREPARED_STATEMENTS", "True") == "True"
+
         # db connection credentials
         # if any are unavailable, raise error.
         try:
@@ -92,7 +141,10 @@ class AugurManager:
 
     def get_engine(self):
         """
-        Creates _engine.Engine object connected to our Augur database.
+        Returns _engine.Engine object connected to our Augur database.
+
+        The engine and its connection pool are created once per process
+        and shared by every AugurManager, see engine_registry.
 
         Returns:
         --------
@@ -107,33 +159,58 @@ class AugurManager:
             self.user, self.password, self.host, self.port, self.database
         )
 
-        engine = salc.create_engine(
+        engine, created = engine_registry.get(
             database_connection_string,
             connect_args={"options": "-csearch_path={}".format(self.schema)},
-            pool_pre_ping=True,
         )
 
-        # verify that engine works
-        try:
-            # context managed connect, closes automatically
-            with engine.connect() as conn:
-                logging.warning("AUGUR: Connection to DB succeeded")
+        # verify that a new engine works
+        if created:
+            try:
+                # context managed connect, closes automatically
+                with engine.connect() as conn:
+                    logging.warning("AUGUR: Connection to DB succeeded")
 
-            self.engine = engine
+            except SQLAlchemyError as err:
+                engine_registry.discard(database_connection_string)
+                logging.error(f"AUGUR: DB couldn't connect: {err.__cause__}")
+                raise SQLAlchemyError(err)
 
-        except SQLAlchemyError as err:
-            logging.error(f"AUGUR: DB couldn't connect: {err.__cause__}")
-            raise SQLAlchemyError(err)
+        self.engine = engine
 
         return engine
 
-    def run_query(self, query_string: str) -> pd.DataFrame:
+    def _connect(self, raw=False):
+        """
+        (private)
+        Checks a connection out of the engine's pool and records
+        how long that waited.
+
+        Args:
+        -----
+            raw (bool): return the DBAPI connection instead of a SQLAlchemy Connection.
+
+        Returns:
+        --------
+            Connection: pooled connection, returned to the pool when closed.
+        """
+        start = time.perf_counter()
+        conn = self.engine.raw_connection() if raw else self.engine.connect()
+        engine_registry.record_wait(self.engine, time.perf_counter() - start)
+
+        return conn
+
+    def run_query(self, query_string: str, column_types: dict = None, params: dict = None) -> pd.DataFrame:
         """
         Runs SQL query against our Augur database.
 
         Args:
         -----
             query_string (str): SQL query to run.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+                If given, the result is read with COPY instead of row by row.
+            params (dict): values of the query's bind parameters. A query with
+                parameters is run as a prepared statement.
 
         Returns:
         --------
@@ -143,20 +220,434 @@ class AugurManager:
             logging.critical("No engine- please use 'get_engine' method to create engine.")
             return None
 
+        if column_types is not None:
+            try:
+                return self._copy_query(query_string, column_types, params)
+            except (SQLAlchemyError, psycopg2.Error, pa.ArrowInvalid) as err:
+                logging.warning(f"AUGUR: COPY failed, reading query row by row: {err}")
+
         result_df = pd.DataFrame()
 
+        try:
+            with self._connect() as conn:
+                if params and self.prepare_statements:
+                    result_df = self._read_prepared(conn, query_string, params)
+                else:
+                    result_df = pd.read_sql(salc.sql.text(query_string), con=conn, params=params)
+        except:
+            raise Exception("DB Read Failure")
+
+        # read_sql already returns a default index, no need to reset it.
+        return result_df
+
+    def _prepare(self, conn, query_string: str):
+        """
+        (private)
+        Prepares the query on the connection's database session,
+        unless it already was. Prepared statements live as long as
+        the pooled DBAPI connection, which keeps track of them.
+
+        Args:
+        -----
+            conn (Connection): connection checked out of the pool.
+            query_string (str): SQL query with ':name' bind parameters.
+
+        Returns:
+        --------
+            (str, list[str]): name of the prepared statement and its parameters, in order.
+        """
+        names = list(dict.fromkeys(_BIND_PARAM.findall(query_string)))
+        name = "augur_" + hashlib.md5(query_string.encode("utf-8")).hexdigest()[:16]
+
+        prepared = conn.connection.info.setdefault("prepared_statements", set())
+        if name in prepared:
+            engine_registry.record_statement(self.engine, hit=True)
+            return name, names
+
+        # PREPARE takes positional parameters, their types are inferred from the query
+        positional = _BIND_PARAM.sub(lambda m: f"${names.index(m.group(1)) + 1}", query_string)
+
+        start = time.perf_counter()
+        with conn.connection.cursor() as cur:
+            cur.execute(f"PREPARE {name} AS {positional}")
+        engine_registry.record_statement(self.engine, hit=False, seconds=time.perf_counter() - start)
+
+        prepared.add(name)
+        return name, names
+
+    def _read_prepared(self, conn, query_string: str, params: dict) -> pd.DataFrame:
+        """
+        (private)
+        Runs the query as a prepared statement, preparing it first
+        if this connection hasn't yet.
+
+        Args:
+        -----
+            conn (Connection): connection checked out of the pool.
+            query_string (str): SQL query with ':name' bind parameters.
+            params (dict): values of the bind parameters.
+
+        Returns:
+        --------
+            pd.DataFrame: Results from SQL query.
+        """
+        name = None
+        trans = conn.begin()
+        try:
+            name, names = self._prepare(conn, query_string)
+            execute = salc.sql.text(f"EXECUTE {name}({', '.join(':' + n for n in names)})")
+            result_df = pd.read_sql(execute, con=conn, params=params)
+            trans.commit()
+            return result_df
+        except (SQLAlchemyError, psycopg2.Error) as err:
+            logging.warning(f"AUGUR: prepared statement failed, running query unprepared: {err}")
+            trans.rollback()
+
+            # a rollback doesn't undo PREPARE, a statement that was prepared is dropped
+            # so that the next run on this connection can prepare it again
+            if name is not None:
+                self._deallocate(conn, name)
+
+            return pd.read_sql(salc.sql.text(query_string), con=conn, params=params)
+
+    def _deallocate(self, conn, name: str):
+        """
+        (private)
+        Drops a prepared statement from the connection's database
+        session and from the statements the connection keeps track of.
+        The statement stays tracked if it couldn't be dropped, so the
+        connection keeps executing it rather than failing to prepare it.
+
+        Args:
+        -----
+            conn (Connection): connection checked out of the pool.
+            name (str): name of the prepared statement.
+        """
+        try:
+            with conn.begin():
+                conn.exec_driver_sql(f"DEALLOCATE {name}")
+        except (SQLAlchemyError, psycopg2.Error) as err:
+            logging.warning(f"AUGUR: couldn't drop prepared statement {name}: {err}")
+            return
+
+        conn.connection.info.get("prepared_statements", set()).discard(name)
+
+    def planning_time(self, query_string: str, params: dict) -> float:
+        """
+        Asks Postgres how long planning the query takes as a prepared
+        statement, to compare with an unprepared run's planning time
+        (EXPLAIN (SUMMARY) of the query with the same values).
+
+        Args:
+        -----
+            query_string (str): SQL query with ':name' bind parameters.
+            params (dict): values of the bind parameters.
+
+        Returns:
+        --------
+            float: planning time in seconds
+        """
+        with self._connect() as conn:
+            name, names = self._prepare(conn, query_string)
+            explain = salc.sql.text(f"EXPLAIN (SUMMARY) EXECUTE {name}({', '.join(':' + n for n in names)})")
+            lines = [row[0] for row in conn.execute(explain, params)]
+
+        planning = [l for l in lines if l.startswith("Planning Time:")]
+        return float(planning[0].split(":")[1].strip().split(" ")[0]) / 1000 if planning else 0.0
+
+    def stream_query(self, query_string: str, batch_size: int = None, column_types: dict = None, params: dict = None):
+        """
+        Runs SQL query against our Augur database through a
+        server-side cursor, so at most 'batch_size' rows of the
+        result are held in memory at a time.
+
+        With 'column_types' the result is streamed with COPY instead
+        and parsed AUGUR_COPY_BLOCK_SIZE bytes at a time.
+
+        Args:
+        -----
+            query_string (str): SQL query to run.
+            batch_size (int): rows per yielded dataframe, defaults to AUGUR_QUERY_BATCH_SIZE.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+            params (dict): values of the query's bind parameters.
+
+        Yields:
+        -------
+            pd.DataFrame: consecutive batches of the results from SQL query.
+                A query without results yields one empty dataframe with the result's columns.
+        """
+        if self.engine is None:
+            logging.critical("No engine- please use 'get_engine' method to create engine.")
+            return
+
+        if column_types is not None:
+            batches = self._stream_copy(query_string, column_types, params)
+            try:
+                first_df = next(batches)
+            except (SQLAlchemyError, psycopg2.Error, pa.ArrowInvalid) as err:
+                # nothing has been yielded yet, the cursor can still take over
+                logging.warning(f"AUGUR: COPY failed, streaming query through cursor: {err}")
+            else:
+                yield first_df
+                yield from batches
+                return
+
+        batch_size = batch_size or self.batch_size
+
         query = salc.sql.text(query_string)
 
         try:
-            with self.engine.connect() as conn:
-                result_df = pd.read_sql(query, con=conn)
-        except:
+            # stream_results makes psycopg2 use a named (server-side) cursor
+            with self._connect().execution_options(stream_results=True, max_row_buffer=batch_size) as conn:
+                for batch_df in pd.read_sql(query, con=conn, params=params, chunksize=batch_size):
+                    yield batch_df
+        except SQLAlchemyError:
             raise Exception("DB Read Failure")
 
-        result_df = result_df.reset_index()
-        result_df.drop("index", axis=1, inplace=True)
+    def stream_query_groups(
+        self,
+        query_string: str,
+        key: str,
+        keys=(),
+        batch_size: int = None,
+        column_types: dict = None,
+        params: dict = None,
+    ):
+        """
+        Streams the results of a SQL query that is ordered by 'key'
+        and yields all rows with the same value of 'key' together,
+        as soon as the last of them has been read.
 
-        return result_df
+        Memory is bounded by the batch size plus the rows of the
+        largest group, rather than by the size of the whole result.
+
+        Args:
+        -----
+            query_string (str): SQL query to run, must ORDER BY the column 'key'.
+            key (str): column that groups the rows, e.g. the repo id.
+            keys (list): values of 'key' that are expected. Those without rows
+                are yielded last, with an empty dataframe.
+            batch_size (int): rows fetched at a time, defaults to AUGUR_QUERY_BATCH_SIZE.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column, see 'stream_query'.
+            params (dict): values of the query's bind parameters.
+
+        Yields:
+        -------
+            (object, pd.DataFrame): value of 'key' and its rows, with a default index.
+        """
+        columns = None
+        seen = set()
+
+        # rows of the group currently being read, possibly spread over batches
+        pending = []
+        pending_key = None
+
+        for batch_df in self.stream_query(query_string, batch_size, column_types, params):
+            columns = batch_df.columns
+            if batch_df.empty:
+                continue
+
+            # split the batch where the value of 'key' changes
+            values = batch_df[key].to_numpy()
+            bounds = [0, *(np.flatnonzero(values[1:] != values[:-1]) + 1), len(values)]
+
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                k = values[start]
+                k = k.item() if isinstance(k, np.generic) else k
+                if pending and k != pending_key:
+                    yield pending_key, pd.concat(pending, ignore_index=True)
+                    pending = []
+
+                if not pending:
+                    if k in seen:
+                        raise ValueError(f"AUGUR: streamed query isn't ordered by {key}")
+                    seen.add(k)
+                    pending_key = k
+
+                pending.append(batch_df.iloc[start:end])
+
+        if pending:
+            yield pending_key, pd.concat(pending, ignore_index=True)
+
+        for k in keys:
+            if k not in seen:
+                yield k, pd.DataFrame(columns=columns)
+
+    def _copy_to(self, query_string: str, file, params: dict = None):
+        """
+        (private)
+        Writes the result of the query to 'file' as CSV with a
+        header, using COPY ... TO STDOUT.
+
+        The session time zone is set to UTC for the COPY, so
+        timestamps with and without time zone are written in UTC.
+
+        COPY takes no parameters, so the values of bind parameters
+        are escaped into the query by psycopg2.
+
+        Args:
+        -----
+            query_string (str): SQL query to run.
+            file (file-like): binary file the CSV is written to.
+            params (dict): values of the query's bind parameters.
+        """
+        conn = self._connect(raw=True)
+        try:
+            with conn.cursor() as cur:
+                if params:
+                    pyformat = str(salc.sql.text(query_string).compile(dialect=self.engine.dialect))
+                    query_string = cur.mogrify(pyformat, params).decode(conn.encoding)
+                cur.execute("SET LOCAL TIME ZONE 'UTC'")
+                cur.copy_expert(f"COPY ({query_string}) TO STDOUT WITH (FORMAT csv, HEADER true)", file)
+            # only read, ends the transaction SET LOCAL applies to
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def _csv_convert_options(self, column_types: dict):
+        """
+        (private)
+        Arrow CSV options for parsing the COPY output of a query
+        with the declared column types.
+
+        Timestamps are read as strings and converted by '_convert_timestamps',
+        because the declared type can't tell whether Postgres writes an offset.
+        Postgres writes NULL as an empty field and empty strings as "",
+        and booleans as t and f, which Arrow doesn't read by default.
+
+        Args:
+        -----
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+
+        Returns:
+        --------
+            pacsv.ConvertOptions: options for the CSV reader
+        """
+        return pacsv.ConvertOptions(
+            column_types={col: pa.string() if pa.types.is_timestamp(typ) else typ for col, typ in column_types.items()},
+            null_values=[""],
+            true_values=["t", "1", "true", "True", "TRUE"],
+            false_values=["f", "0", "false", "False", "FALSE"],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        )
+
+    def _convert_timestamps(self, data: pa.Table, column_types: dict) -> pa.Table:
+        """
+        (private)
+        Converts the timestamp columns of parsed COPY output
+        from UTC strings to their declared timestamp type.
+
+        Args:
+        -----
+            data (pa.Table): parsed COPY output.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+
+        Returns:
+        --------
+            pa.Table: data with timestamp columns converted
+        """
+        for col, typ in column_types.items():
+            if not pa.types.is_timestamp(typ):
+                continue
+
+            i = data.schema.get_field_index(col)
+
+            # timestamptz is written with a '+00' offset in UTC, timestamp without one
+            values = pc.replace_substring_regex(data.column(i), pattern=r"\+00$", replacement="")
+            values = values.cast(pa.timestamp(typ.unit))
+            if typ.tz is not None:
+                values = pc.assume_timezone(values, typ.tz)
+
+            data = data.set_column(i, pa.field(col, typ), values)
+
+        return data
+
+    def _copy_query(self, query_string: str, column_types: dict, params: dict = None) -> pd.DataFrame:
+        """
+        (private)
+        Reads the whole result of the query with COPY and parses it
+        with Arrow's multi-threaded CSV reader.
+
+        Args:
+        -----
+            query_string (str): SQL query to run.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+            params (dict): values of the query's bind parameters.
+
+        Returns:
+        --------
+            pd.DataFrame: Results from SQL query.
+        """
+        buf = io.BytesIO()
+        self._copy_to(query_string, buf, params)
+        buf.seek(0)
+
+        table = pacsv.read_csv(buf, convert_options=self._csv_convert_options(column_types))
+        del buf
+
+        return self._convert_timestamps(table, column_types).to_pandas()
+
+    def _stream_copy(self, query_string: str, column_types: dict, params: dict = None):
+        """
+        (private)
+        Streams the result of the query with COPY through a pipe
+        into Arrow's streaming CSV reader, one block at a time.
+
+        Args:
+        -----
+            query_string (str): SQL query to run.
+            column_types (dict[str, pa.DataType]): Arrow type of every result column.
+            params (dict): values of the query's bind parameters.
+
+        Yields:
+        -------
+            pd.DataFrame: consecutive batches of the results from SQL query.
+                A query without results yields one empty dataframe with the result's columns.
+        """
+        read_fd, write_fd = os.pipe()
+        errors = []
+
+        def copy_to_pipe():
+            try:
+                with os.fdopen(write_fd, "wb") as pipe_out:
+                    self._copy_to(query_string, pipe_out, params)
+            except Exception as err:
+                errors.append(err)
+
+        writer = threading.Thread(target=copy_to_pipe, daemon=True)
+        writer.start()
+
+        try:
+            with os.fdopen(read_fd, "rb") as pipe_in:
+                try:
+                    reader = pacsv.open_csv(
+                        pipe_in,
+                        read_options=pacsv.ReadOptions(block_size=self.copy_block_size),
+                        convert_options=self._csv_convert_options(column_types),
+                    )
+                    batches = 0
+                    for batch in reader:
+                        batches += 1
+                        table = pa.Table.from_batches([batch])
+                        yield self._convert_timestamps(table, column_types).to_pandas()
+
+                    if not batches:
+                        yield self._convert_timestamps(reader.schema.empty_table(), column_types).to_pandas()
+                except pa.ArrowInvalid:
+                    # a failed COPY shows up as cut-off CSV, report why it failed.
+                    # closing the pipe first keeps a blocked writer from hanging.
+                    pipe_in.close()
+                    writer.join()
+                    if errors:
+                        raise errors[0]
+                    raise
+        finally:
+            writer.join()
+
+        # the CSV could have been cut off cleanly at a row
+        if errors:
+            raise errors[0]
 
     def multiselect_startup(self):
         logging.warning(f"MULTISELECT_STARTUP")
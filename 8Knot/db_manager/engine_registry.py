@@ -0,0 +1,263 @@
+import os
+import logging
+import threading
+import time
+import sqlalchemy as salc
+from sqlalchemy import event
+
+# checkouts that wait longer than this are logged, the pool is likely exhausted.
+SLOW_CHECKOUT_SECONDS = 1.0
+
+# seconds between two logs of a process's pool and statement stats, 0 disables them.
+STATS_INTERVAL = float(os.getenv("AUGUR_POOL_STATS_INTERVAL", 300))
+
+
+class EngineRegistry:
+    """
+    Process-wide SQLAlchemy engines, one per database URL, so that
+    every AugurManager in a process shares one connection pool.
+
+    Engines are never shared across processes. A registry that finds
+    itself in a forked child (Celery prefork worker, gunicorn worker)
+    drops the engines it inherited without closing their connections,
+    which still belong to the parent, and builds new ones on demand.
+
+    Configuration (environment):
+    -----------------------------
+        AUGUR_POOL_SIZE : connections kept open per process. Default 5.
+        AUGUR_POOL_MAX_OVERFLOW : extra connections opened under load, closed when returned. Default 10.
+        AUGUR_POOL_RECYCLE : seconds after which a connection is replaced. Default 1800.
+        AUGUR_POOL_TIMEOUT : seconds to wait for a free connection before failing. Default 30.
+
+    Attributes:
+    -----------
+        _engines : (private) dict of URL -> Engine
+        _stats : (private) dict of Engine -> counters for the engine's pool
+        _pid : (private) process the engines were created in
+        _logged_at : (private) monotonic time stats were last logged at
+        _lock : (private) guards the above
+
+    Methods:
+    --------
+        get(url, connect_args):
+            Returns the engine for url, creating it on first use.
+
+        discard(url):
+            Disposes of the engine for url, e.g. after its test connection failed.
+
+        dispose(close):
+            Disposes of all engines.
+
+        record_wait(engine, seconds):
+            Records how long a connection checkout waited.
+
+        record_statement(engine, hit, seconds):
+            Records a prepared statement lookup and how long preparing took.
+
+        stats():
+            Returns connection counts, checkout wait times and prepared
+            statement counts per engine.
+
+        log_stats(interval):
+            Logs stats() at most once every interval seconds.
+    """
+
+    def __init__(self):
+        self._engines = {}
+        self._stats = {}
+        self._pid = os.getpid()
+        self._logged_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _check_pid(self):
+        """
+        (private)
+        Drops engines inherited from a parent process.
+        Caller must hold '_lock'.
+        """
+        if self._pid == os.getpid():
+            return
+
+        for engine in self._engines.values():
+            engine.dispose(close=False)
+        self._engines = {}
+        self._stats = {}
+        self._pid = os.getpid()
+
+    def _instrument(self, engine):
+        """
+        (private)
+        Counts connections opened and checked out of engine's pool.
+
+        Args:
+        -----
+            engine (Engine): engine to instrument
+        """
+        stats = {
+            "connects": 0,
+            "checkouts": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "statements_prepared": 0,
+            "statement_cache_hits": 0,
+            "prepare_seconds": 0.0,
+        }
+        self._stats[engine] = stats
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            stats["connects"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            stats["checkouts"] += 1
+
+    def get(self, url, connect_args=None):
+        """Returns the engine for url, creating it with the
+        configured pool the first time it's asked for in this process.
+
+        Args:
+            url (str): database URL
+            connect_args (dict): arguments passed to the DBAPI connect()
+
+        Returns:
+            (Engine, bool): engine and whether it was just created.
+        """
+        with self._lock:
+            self._check_pid()
+
+            engine = self._engines.get(url)
+            if engine is not None:
+                return engine, False
+
+            engine = salc.create_engine(
+                url,
+                connect_args=connect_args or {},
+                pool_pre_ping=True,
+                pool_size=int(os.getenv("AUGUR_POOL_SIZE", 5)),
+                max_overflow=int(os.getenv("AUGUR_POOL_MAX_OVERFLOW", 10)),
+                pool_recycle=int(os.getenv("AUGUR_POOL_RECYCLE", 1800)),
+                pool_timeout=int(os.getenv("AUGUR_POOL_TIMEOUT", 30)),
+            )
+            self._instrument(engine)
+            self._engines[url] = engine
+
+            return engine, True
+
+    def discard(self, url):
+        """Disposes of the engine for url so the next 'get' creates a new one.
+
+        Args:
+            url (str): database URL
+        """
+        with self._lock:
+            engine = self._engines.pop(url, None)
+            self._stats.pop(engine, None)
+
+        if engine is not None:
+            engine.dispose()
+
+    def dispose(self, close=True):
+        """Disposes of all engines.
+
+        Args:
+            close (bool): close pooled connections. False in a forked
+                child, whose inherited connections belong to the parent.
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose(close=close)
+            self._engines = {}
+            self._stats = {}
+            self._pid = os.getpid()
+
+    def record_wait(self, engine, seconds):
+        """Records how long checking a connection out of engine's pool took.
+
+        Args:
+            engine (Engine): engine the connection was checked out of
+            seconds (float): time spent waiting for the connection
+        """
+        stats = self._stats.get(engine)
+        if stats is None:
+            return
+
+        stats["wait_seconds"] += seconds
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], seconds)
+
+        if seconds > SLOW_CHECKOUT_SECONDS:
+            logging.warning(f"AUGUR: waited {seconds:.2f}s for a DB connection: {engine.pool.status()}")
+
+    def record_statement(self, engine, hit, seconds=0.0):
+        """Records a query run as a prepared statement on one of engine's connections.
+
+        Args:
+            engine (Engine): engine the connection was checked out of
+            hit (bool): whether the connection had already prepared the query
+            seconds (float): time spent preparing it, if it hadn't
+        """
+        stats = self._stats.get(engine)
+        if stats is None:
+            return
+
+        if hit:
+            stats["statement_cache_hits"] += 1
+        else:
+            stats["statements_prepared"] += 1
+            stats["prepare_seconds"] += seconds
+
+    def stats(self):
+        """Connection counts, checkout wait times and prepared
+        statement counts of this process's engines.
+
+        The statement cache hit rate is statement_cache_hits over
+        statement_cache_hits + statements_prepared.
+
+        Returns:
+            dict: {url without password: {pool_size, checked_out, overflow,
+                connects, checkouts, wait_seconds, max_wait_seconds,
+                statements_prepared, statement_cache_hits, prepare_seconds}}
+        """
+        with self._lock:
+            self._check_pid()
+
+            return {
+                engine.url.render_as_string(hide_password=True): {
+                    "pool_size": engine.pool.size(),
+                    "checked_out": engine.pool.checkedout(),
+                    "overflow": engine.pool.overflow(),
+                    **self._stats[engine],
+                }
+                for engine in self._engines.values()
+            }
+
+    def log_stats(self, interval):
+        """Logs this process's stats(), unless they were logged
+        less than 'interval' seconds ago.
+
+        Called after every task and request, so that pool waits and
+        statement cache hit rates show up in the logs of every process.
+
+        Args:
+            interval (float): seconds between two logs, 0 or less disables logging.
+
+        Returns:
+            bool: whether the stats were logged.
+        """
+        if interval <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._logged_at < interval:
+                return False
+            self._logged_at = now
+
+        for url, stats in self.stats().items():
+            logging.warning(f"AUGUR: pool stats of {url} in process {os.getpid()}: {stats}")
+
+        return True
+
+
+# engines shared by everything in this process
+engine_registry = EngineRegistry()
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the web server, read from the working directory.
+
+Engines are imported in the hooks rather than here, gunicorn reads this
+file before the app's directory is importable.
+"""
+
+
+def post_fork(server, worker):
+    """
+    Drops the database engines a forked web worker inherited,
+    so that each worker opens and pools its own connections.
+    """
+    from db_manager.engine_registry import engine_registry
+
+    engine_registry.dispose(close=False)
+
+
+def post_request(worker, req, environ, resp):
+    """
+    Logs the web worker's connection pool waits and prepared
+    statement counts every AUGUR_POOL_STATS_INTERVAL seconds.
+    """
+    from db_manager.engine_registry import engine_registry, STATS_INTERVAL
+
+    engine_registry.log_stats(STATS_INTERVAL)
@@ -133,12 +133,16 @@ def toggle_popover(n, is_open):
     background=True,
 )
 def commit_domains_graph(repolist, num, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["author_email", "author_timestamp"]
+    filters = [("author_timestamp", ">=", start_date), ("author_timestamp", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=cq, repos=repolist)
+    df = cache.grabm(func=cq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=cq, repos=repolist)
+        cache.wait_ready(func=cq, repos=repolist)
+        df = cache.grabm(func=cq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -149,7 +153,7 @@ def commit_domains_graph(repolist, num, start_date, end_date):
         return nodata_graph
 
     # function for all data pre processing, COULD HAVE ADDITIONAL INPUTS AND OUTPUTS
-    df = process_data(df, num, start_date, end_date)
+    df = process_data(df, num)
 
     fig = create_figure(df)
 
@@ -157,21 +161,12 @@ def commit_domains_graph(repolist, num, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, num, start_date, end_date):
+def process_data(df: pd.DataFrame, num):
     # TODO: create docstring
 
-    # convert to datetime objects rather than strings
-    df["author_timestamp"] = pd.to_datetime(df["author_timestamp"], utc=True)
-
     # order values chronologically by author_timestamp date earliest to latest
     df = df.sort_values(by="author_timestamp", axis=0, ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.author_timestamp >= start_date]
-    if end_date is not None:
-        df = df[df.author_timestamp <= end_date]
-
     # creates list of emails for each contribution and flattens list result
     emails = df.author_email.tolist()
 
@@ -152,12 +152,16 @@ def compay_associated_activity_graph(repolist, num, start_date, end_date):
     will have many emails. We acknowledge that this will almost always contribute to an overcount but will never undercount."
     """
 
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["email_list", "created"]
+    filters = [("created", ">=", start_date), ("created", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=cmq, repos=repolist)
+    df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=cmq, repos=repolist)
+        cache.wait_ready(func=cmq, repos=repolist)
+        df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -168,7 +172,7 @@ def compay_associated_activity_graph(repolist, num, start_date, end_date):
         return nodata_graph
 
     # function for all data pre processing, COULD HAVE ADDITIONAL INPUTS AND OUTPUTS
-    df = process_data(df, num, start_date, end_date)
+    df = process_data(df, num)
 
     fig = create_figure(df)
 
@@ -176,19 +180,10 @@ def compay_associated_activity_graph(repolist, num, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, num, start_date, end_date):
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-
+def process_data(df: pd.DataFrame, num):
     # order values chronologically by COLUMN_TO_SORT_BY date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created >= start_date]
-    if end_date is not None:
-        df = df[df.created <= end_date]
-
     # creates list of emails for each contribution and flattens list result
     emails = df.email_list.str.split(" , ").explode("email_list").tolist()
 
@@ -149,12 +149,16 @@ def toggle_popover(n, is_open):
     background=True,
 )
 def compay_associated_activity_graph(repolist, contributions, contributors, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["cntrb_id", "email_list", "created"]
+    filters = [("created", ">=", start_date), ("created", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=cmq, repos=repolist)
+    df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=cmq, repos=repolist)
+        cache.wait_ready(func=cmq, repos=repolist)
+        df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -165,7 +169,7 @@ def compay_associated_activity_graph(repolist, contributions, contributors, star
         return nodata_graph
 
     # function for all data pre processing, COULD HAVE ADDITIONAL INPUTS AND OUTPUTS
-    df = process_data(df, contributions, contributors, start_date, end_date)
+    df = process_data(df, contributions, contributors)
 
     fig = create_figure(df)
 
@@ -173,19 +177,10 @@ def compay_associated_activity_graph(repolist, contributions, contributors, star
     return fig
 
 
-def process_data(df: pd.DataFrame, contributions, contributors, start_date, end_date):
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-
+def process_data(df: pd.DataFrame, contributions, contributors):
     # order values chronologically by COLUMN_TO_SORT_BY date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created >= start_date]
-    if end_date is not None:
-        df = df[df.created <= end_date]
-
     # groups contributions by countributor id and counts, created column now hold the number
     # of contributions for its respective contributor
     df = df.groupby(["cntrb_id", "email_list"], as_index=False)[["created"]].count()
@@ -130,12 +130,16 @@ def toggle_popover(n, is_open):
     background=True,
 )
 def gh_company_affiliation_graph(repolist, num, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["cntrb_company", "created"]
+    filters = [("created", ">=", start_date), ("created", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=cmq, repos=repolist)
+    df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=cmq, repos=repolist)
+        cache.wait_ready(func=cmq, repos=repolist)
+        df = cache.grabm(func=cmq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -146,7 +150,7 @@ def gh_company_affiliation_graph(repolist, num, start_date, end_date):
         return nodata_graph
 
     # function for all data pre processing, COULD HAVE ADDITIONAL INPUTS AND OUTPUTS
-    df = process_data(df, num, start_date, end_date)
+    df = process_data(df, num)
 
     fig = create_figure(df)
 
@@ -154,23 +158,14 @@ def gh_company_affiliation_graph(repolist, num, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, num, start_date, end_date):
+def process_data(df: pd.DataFrame, num):
     """Implement your custom data-processing logic in this function.
     The output of this function is the data you intend to create a visualization with,
     requiring no further processing."""
 
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-
     # order values chronologically by COLUMN_TO_SORT_BY date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created >= start_date]
-    if end_date is not None:
-        df = df[df.created <= end_date]
-
     # intital count of same company name in github profile
     result = df.cntrb_company.value_counts(dropna=False)
 
@@ -237,7 +237,7 @@ def project_velocity_graph(
     cache = cm()
     df = cache.grabm(func=ctq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=ctq, repos=repolist)
         df = cache.grabm(func=ctq, repos=repolist)
 
     start = time.perf_counter()
@@ -268,9 +268,6 @@ def process_data(
     pr_c_weight,
 ):
 
-    # convert to datetime objects rather than strings
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-
     # order values chronologically by COLUMN_TO_SORT_BY date
     df = df.sort_values(by="created_at", axis=0, ascending=True)
 
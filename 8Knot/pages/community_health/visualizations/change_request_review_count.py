@@ -111,7 +111,8 @@ def avg_comments_per_pr(repolist):
     df1 = cache.grabm(func=prsq, repos=repolist)
     df2 = cache.grabm(func=prrq, repos=repolist)
     while df1 is None or df2 is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=prsq, repos=repolist)
+        cache.wait_ready(func=prrq, repos=repolist)
         df1 = cache.grabm(func=prsq, repos=repolist)
         df2 = cache.grabm(func=prrq, repos=repolist)
 
@@ -10,7 +10,7 @@ import logging
 from dateutil.relativedelta import *  # type: ignore
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
-from queries.commits_query import commits_query as ctq
+from queries.commits_rollup_query import commits_rollup_query as crq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
@@ -118,12 +118,16 @@ def graph_title(k):
     background=True,
 )
 def commit_frequency_graph(repolist, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["day"]
+    filters = [("day", ">=", start_date), ("day", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=crq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=crq, repos=repolist)
+        df = cache.grabm(func=crq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -134,7 +138,7 @@ def commit_frequency_graph(repolist, start_date, end_date):
         return nodata_graph, False
 
     # function for all data pre processing
-    df = process_data(df, start_date, end_date)
+    df = process_data(df)
 
     fig = create_figure(df)
 
@@ -143,28 +147,19 @@ def commit_frequency_graph(repolist, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, start_date, end_date):
-
-    # convert to datetime objects rather than strings
-    df["date"] = pd.to_datetime(df["date"], utc=True)
-
-    # order values chronologically by created_at date
-    df = df.sort_values(by="date", ascending=True)
+def process_data(df: pd.DataFrame):
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created_at >= start_date]
-    if end_date is not None:
-        df = df[df.created_at <= end_date]
+    # order values chronologically by day
+    df = df.sort_values(by="day", ascending=True)
 
-    # Extract month from the 'date' column
-    df['month'] = df['date'].dt.to_period('M')
+    # Extract month from the 'day' column
+    df['month'] = df['day'].dt.to_period('M')
     
     
      # contributor_count : Determine number of commits per month in the past year.
 
     # Create a Dataframe for the count of commits per month
-    result_df = df.groupby('month')['author_timestamp'].nunique().reset_index(name='num_commits')
+    result_df = df.groupby('month')['day'].nunique().reset_index(name='num_commits')
     
     # Convert month column to datetime
 
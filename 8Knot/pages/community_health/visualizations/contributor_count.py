@@ -10,7 +10,7 @@ import logging
 from dateutil.relativedelta import *  # type: ignore
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
-from queries.contributors_query import contributors_query as ctq
+from queries.contributors_rollup_query import contributors_rollup_query as cnrq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
@@ -119,12 +119,16 @@ def graph_title(k):
     background=True,
 )
 def contributor_count_graph(repolist, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["cntrb_id", "day"]
+    filters = [("day", ">=", start_date), ("day", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=cnrq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=cnrq, repos=repolist)
+        df = cache.grabm(func=cnrq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -135,7 +139,7 @@ def contributor_count_graph(repolist, start_date, end_date):
         return nodata_graph, False
 
     # function for all data pre processing
-    df = process_data(df, start_date, end_date)
+    df = process_data(df)
 
     fig = create_figure(df)
 
@@ -144,22 +148,13 @@ def contributor_count_graph(repolist, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, start_date, end_date):
-
-    # convert to datetime objects rather than strings
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-
-    # order values chronologically by created_at date
-    df = df.sort_values(by="created_at", ascending=True)
+def process_data(df: pd.DataFrame):
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created_at >= start_date]
-    if end_date is not None:
-        df = df[df.created_at <= end_date]
+    # order values chronologically by day
+    df = df.sort_values(by="day", ascending=True)
 
-    # Extract month from the 'date' column
-    df['month'] = df['created_at'].dt.to_period('M')
+    # Extract month from the 'day' column
+    df['month'] = df['day'].dt.to_period('M')
     
     
      # contributor_count : Determine how many active commit authors, review participants, issue authors, and issue comments participants there are in the past 90 days.
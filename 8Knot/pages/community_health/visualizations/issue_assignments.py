@@ -118,7 +118,7 @@ def issues_over_time_graph(repolist, interval):
     cache = cm()
     df = cache.grabm(func=iq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=iq, repos=repolist)
         df = cache.grabm(func=iq, repos=repolist)
 
     # data ready.
@@ -141,9 +141,6 @@ def issues_over_time_graph(repolist, interval):
 
 def process_data(df: pd.DataFrame, interval):
     print(list(df.head()))
-    # convert to datetime objects rather than strings
-    df["assign_date"] = pd.to_datetime(df["assign_date"], utc=True)
-
     # order values chronologically by creation date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
@@ -8,7 +8,7 @@ import pandas as pd
 import logging
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 from pages.utils.job_utils import nodata_graph
-from queries.issues_query import issues_query as iq
+from queries.issues_rollup_query import issues_rollup_query as irq
 from cache_manager.cache_manager import CacheManager as cm
 import io
 import time
@@ -116,10 +116,10 @@ def toggle_popover(n, is_open):
 def issues_over_time_graph(repolist, interval):
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=iq, repos=repolist)
+    df = cache.grabm(func=irq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=iq, repos=repolist)
+        cache.wait_ready(func=irq, repos=repolist)
+        df = cache.grabm(func=irq, repos=repolist)
 
     # data ready.
     start = time.perf_counter()
@@ -141,12 +141,6 @@ def issues_over_time_graph(repolist, interval):
 
 
 def process_data(df: pd.DataFrame, interval):
-    # convert to datetime objects rather than strings
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-
-    # order values chronologically by creation date
-    df = df.sort_values(by="created", axis=0, ascending=True)
-
     # variable to slice on to handle weekly period edge case
     period_slice = None
     if interval == "W":
@@ -154,9 +148,9 @@ def process_data(df: pd.DataFrame, interval):
         period_slice = 10
 
 
-    # df for closed issues in time interval
-    closed_range = pd.to_datetime(df["closed"]).dt.to_period(interval).value_counts().sort_index()
-    df_closed = closed_range.to_frame().reset_index().rename(columns={"index": "Date"})
+    # df for closed issues in time interval, adding up the daily counts
+    closed_range = df.groupby(df["day"].dt.to_period(interval))["closed"].sum().sort_index()
+    df_closed = closed_range.to_frame().reset_index().rename(columns={"day": "Date"})
     df_closed["Date"] = pd.to_datetime(df_closed["Date"].astype(str).str[:period_slice])
 
     # formatting for graph generation
@@ -150,7 +150,7 @@ def cntrib_issue_assignment_graph(repolist, interval, assign_req):
     cache = cm()
     df = cache.grabm(func=iaq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=iaq, repos=repolist)
         df = cache.grabm(func=iaq, repos=repolist)
 
     start = time.perf_counter()
@@ -171,11 +171,6 @@ def cntrib_issue_assignment_graph(repolist, interval, assign_req):
 
 def process_data(df: pd.DataFrame, interval, assign_req):
 
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-    df["assign_date"] = pd.to_datetime(df["assign_date"], utc=True)
-
     # order values chronologically by created date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
@@ -7,7 +7,7 @@ import pandas as pd
 import logging
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
-from queries.commits_query import commits_query as cmq
+from queries.commits_rollup_query import commits_rollup_query as crq
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
 import io
@@ -117,10 +117,10 @@ def toggle_popover(n, is_open):
 def commits_over_time_graph(repolist, interval):
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=cmq, repos=repolist)
+    df = cache.grabm(func=crq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=cmq, repos=repolist)
+        cache.wait_ready(func=crq, repos=repolist)
+        df = cache.grabm(func=crq, repos=repolist)
 
     # data ready.
     start = time.perf_counter()
@@ -141,10 +141,8 @@ def commits_over_time_graph(repolist, interval):
 
 
 def process_data(df: pd.DataFrame, interval):
-    # convert to datetime objects with consistent column name
-    # incoming value should be a posix integer.
-    df["date"] = pd.to_datetime(df["date"], utc=True)
-    df.rename(columns={"date": "created"}, inplace=True)
+    # consistent column name
+    df.rename(columns={"day": "created"}, inplace=True)
 
     # variable to slice on to handle weekly period edge case
     period_slice = None
@@ -152,10 +150,10 @@ def process_data(df: pd.DataFrame, interval):
         # this is to slice the extra period information that comes with the weekly case
         period_slice = 10
 
-    # get the count of commits in the desired interval in pandas period format, sort index to order entries
+    # add up the daily commit counts in the desired interval in pandas period format, sort index to order entries
     df_created = (
         df.groupby(by=df.created.dt.to_period(interval))["commits"]
-        .nunique()
+        .sum()
         .reset_index()
         .rename(columns={"created": "Date"})
     )
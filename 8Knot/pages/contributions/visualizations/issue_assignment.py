@@ -113,7 +113,7 @@ def cntrib_issue_assignment_graph(repolist, interval):
     cache = cm()
     df = cache.grabm(func=iaq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=iaq, repos=repolist)
         df = cache.grabm(func=iaq, repos=repolist)
 
     start = time.perf_counter()
@@ -134,11 +134,6 @@ def cntrib_issue_assignment_graph(repolist, interval):
 
 def process_data(df: pd.DataFrame, interval):
 
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-    df["assign_date"] = pd.to_datetime(df["assign_date"], utc=True)
-
     # order values chronologically by created date
     df = df.sort_values(by="created", axis=0, ascending=True)
 
@@ -8,6 +8,7 @@ import pandas as pd
 import logging
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 from pages.utils.job_utils import nodata_graph
+from pages.utils.interval_utils import open_counts
 from queries.issues_query import issues_query as iq
 from cache_manager.cache_manager import CacheManager as cm
 import io
@@ -115,12 +116,15 @@ def toggle_popover(n, is_open):
     background=True,
 )
 def issues_over_time_graph(repolist, interval):
+    # only the columns this graph uses are decoded from the cache.
+    columns = ["created", "closed"]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=iq, repos=repolist)
+    df = cache.grabm(func=iq, repos=repolist, columns=columns)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=iq, repos=repolist)
+        cache.wait_ready(func=iq, repos=repolist)
+        df = cache.grabm(func=iq, repos=repolist, columns=columns)
 
     # data ready.
     start = time.perf_counter()
@@ -142,13 +146,6 @@ def issues_over_time_graph(repolist, interval):
 
 
 def process_data(df: pd.DataFrame, interval):
-    # convert to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-
-    # order values chronologically by creation date
-    df = df.sort_values(by="created", axis=0, ascending=True)
-
     # variable to slice on to handle weekly period edge case
     period_slice = None
     if interval == "W":
@@ -191,8 +188,8 @@ def process_data(df: pd.DataFrame, interval):
     # df for open issues for time interval
     df_open = dates.to_frame(index=False, name="Date")
 
-    # aplies function to get the amount of open issues for each day
-    df_open["Open"] = df_open.apply(lambda row: get_open(df, row.Date), axis=1)
+    # amount of open issues for each day
+    df_open["Open"] = open_counts(df["created"], df["closed"], dates)
 
     df_open["Date"] = df_open["Date"].dt.strftime("%Y-%m-%d")
 
@@ -249,19 +246,3 @@ def create_figure(df_created: pd.DataFrame, df_closed: pd.DataFrame, df_open: pd
     )
 
     return fig
-
-
-# for each day, this function calculates the amount of open issues
-def get_open(df, date):
-    # drop rows that are more recent than the date limit
-    df_lim = df[df["created"] <= date]
-
-    # drops rows that have been closed after date
-    df_open = df_lim[df_lim["closed"] > date]
-
-    # include issues that have not been close yet
-    df_open = pd.concat([df_open, df_lim[df_lim.closed.isnull()]])
-
-    # generates number of columns ie open issues
-    num_open = df_open.shape[0]
-    return num_open
@@ -10,6 +10,7 @@ import logging
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 import io
 from pages.utils.job_utils import nodata_graph
+from pages.utils.interval_utils import open_counts
 from queries.prs_query import prs_query as prq
 from cache_manager.cache_manager import CacheManager as cm
 import time
@@ -116,12 +117,15 @@ def toggle_popover(n, is_open):
     background=True,
 )
 def prs_over_time_graph(repolist, interval):
+    # only the columns this graph uses are decoded from the cache.
+    columns = ["created", "closed", "merged"]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=prq, repos=repolist)
+    df = cache.grabm(func=prq, repos=repolist, columns=columns)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=prq, repos=repolist)
+        cache.wait_ready(func=prq, repos=repolist)
+        df = cache.grabm(func=prq, repos=repolist, columns=columns)
 
     # data ready.
     start = time.perf_counter()
@@ -143,14 +147,6 @@ def prs_over_time_graph(repolist, interval):
 
 
 def process_data(df: pd.DataFrame, interval):
-    # convert dates to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["merged"] = pd.to_datetime(df["merged"], utc=True)
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-
-    # order values chronologically by creation date
-    df = df.sort_values(by="created", axis=0, ascending=True)
-
     # variable to slice on to handle weekly period edge case
     period_slice = None
     if interval == "W":
@@ -205,8 +201,8 @@ def process_data(df: pd.DataFrame, interval):
     # df for open prs from time interval
     df_open = dates.to_frame(index=False, name="Date")
 
-    # aplies function to get the amount of open prs for each day
-    df_open["Open"] = df_open.apply(lambda row: get_open(df, row.Date), axis=1)
+    # amount of open prs for each day
+    df_open["Open"] = open_counts(df["created"], df["closed"], dates)
 
     df_open["Date"] = df_open["Date"].dt.strftime("%Y-%m-%d")
 
@@ -278,19 +274,3 @@ def create_figure(
     )
 
     return fig
-
-
-# for each day, this function calculates the amount of open prs
-def get_open(df, date):
-    # drop rows that are more recent than the date limit
-    df_created = df[df["created"] <= date]
-
-    # drops rows that have been closed after date
-    df_open = df_created[df_created["closed"] > date]
-
-    # include prs that have not been close yet
-    df_open = pd.concat([df_open, df_created[df_created.closed.isnull()]])
-
-    # generates number of columns ie open prs
-    num_open = df_open.shape[0]
-    return num_open
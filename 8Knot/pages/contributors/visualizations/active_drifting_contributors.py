@@ -5,13 +5,13 @@ from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
 import pandas as pd
 import logging
-from dateutil.relativedelta import *  # type: ignore
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 from queries.contributors_query import contributors_query as ctq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
+from pages.utils.interval_utils import active_drifting_away_counts
 import time
 
 PAGE = "contributors"
@@ -169,12 +169,15 @@ def active_drifting_contributors_graph(repolist, interval, drift_interval, away_
     if drift_interval > away_interval:
         return dash.no_update, True
 
+    # only the columns this graph uses are decoded from the cache.
+    columns = ["cntrb_id", "created_at"]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=ctq, repos=repolist, columns=columns)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=ctq, repos=repolist)
+        df = cache.grabm(func=ctq, repos=repolist, columns=columns)
 
     logging.warning(f"ACTIVE_DRIFTING_CONTRIBUTOR_GROWTH_VIZ - START")
     start = time.perf_counter()
@@ -194,15 +197,10 @@ def active_drifting_contributors_graph(repolist, interval, drift_interval, away_
 
 
 def process_data(df: pd.DataFrame, interval, drift_interval, away_interval):
-    # convert to datetime objects with consistent column name
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    # consistent column name
     df.rename(columns={"created_at": "created"}, inplace=True)
 
-    # order from beginning of time to most recent
-    df = df.sort_values("created", axis=0, ascending=True)
-
-    # first and last elements of the dataframe are the
-    # earliest and latest events respectively
+    # earliest and latest events
     earliest, latest = df["created"].min(), df["created"].max()
 
     # beginning to the end of time by the specified interval
@@ -211,12 +209,9 @@ def process_data(df: pd.DataFrame, interval, drift_interval, away_interval):
     # df for active, driving, and away contributors for time interval
     df_status = dates.to_frame(index=False, name="Date")
 
-    # dynamically apply the function to all dates defined in the date_range to create df_status
-    df_status["Active"], df_status["Drifting"], df_status["Away"] = zip(
-        *df_status.apply(
-            lambda row: get_active_drifting_away_up_to(df, row.Date, drift_interval, away_interval),
-            axis=1,
-        )
+    # counts for all dates at once from each contributor's sequence of activity
+    df_status["Active"], df_status["Drifting"], df_status["Away"] = active_drifting_away_counts(
+        df["cntrb_id"], df["created"], dates, drift_interval, away_interval
     )
 
     # formatting for graph generation
@@ -284,34 +279,3 @@ def create_figure(df_status: pd.DataFrame, interval):
     )
 
     return fig
-
-
-def get_active_drifting_away_up_to(df, date, drift_interval, away_interval):
-    # drop rows that are more recent than the date limit
-    df_lim = df[df["created"] <= date]
-
-    # keep more recent contribution per ID
-    df_lim = df_lim.drop_duplicates(subset="cntrb_id", keep="last")
-
-    # time difference, drifting_months before the threshold date
-    drift_mos = date - relativedelta(months=+drift_interval)
-
-    # time difference, away_months before the threshold date
-    away_mos = date - relativedelta(months=+away_interval)
-
-    # number of total contributors up until date
-    numTotal = df_lim.shape[0]
-
-    # number of 'active' contributors, people with contributions before the drift time
-    numActive = df_lim[df_lim["created"] >= drift_mos].shape[0]
-
-    # set of contributions that are before the away time
-    drifting = df_lim[df_lim["created"] > away_mos]
-
-    # number of the set of contributions that are after the drift time, but before away
-    numDrifting = drifting[drifting["created"] < drift_mos].shape[0]
-
-    # difference of the total to get the away value
-    numAway = numTotal - (numActive + numDrifting)
-
-    return [numActive, numDrifting, numAway]
@@ -117,7 +117,7 @@ def contrib_activity_cycle_graph(repolist, interval):
     cache = cm()
     df = cache.grabm(func=cmq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=cmq, repos=repolist)
         df = cache.grabm(func=cmq, repos=repolist)
 
     start = time.perf_counter()
@@ -158,7 +158,7 @@ def repeat_drive_by_graph(repolist, contribs, view):
     cache = cm()
     df = cache.grabm(func=ctq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=ctq, repos=repolist)
         df = cache.grabm(func=ctq, repos=repolist)
 
     # data ready.
@@ -186,8 +186,7 @@ def repeat_drive_by_graph(repolist, contribs, view):
 
 
 def process_data(df, view, contribs):
-    # convert to datetime objects with consistent column name
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    # consistent column name
     df.rename(columns={"created_at": "created"}, inplace=True)
 
     # graph on contribution subset
@@ -15,6 +15,7 @@ from queries.contributors_query import contributors_query as ctq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
+from pages.utils.lottery_utils import lottery_factors
 import time
 import datetime as dt
 from scipy import stats
@@ -22,6 +23,9 @@ from scipy import stats
 PAGE = "contributors"
 VIZ_ID = "lottery-factor-over-time"
 
+# action types plotted, in the order of their traces
+ACTION_TYPES = ["Commit", "Issue Opened", "Issue Comment", "Issue Closed", "PR Opened", "PR Comment", "PR Review"]
+
 gc_lottery_factor_over_time = dbc.Card(
     [
         dbc.CardBody(
@@ -234,13 +238,17 @@ def graph_title(window_width):
 def create_contrib_prolificacy_over_time_graph(
     repolist, patterns, threshold, window_width, step_size, start_date, end_date
 ):
+    # only the columns this graph uses are decoded from the cache,
+    # contributors and actions are only compared, so they stay categorical.
+    columns = ["cntrb_id", "created_at", "login", "Action"]
+
     # main function for all data pre processing
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=ctq, repos=repolist, columns=columns, categorical=True)
 
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=ctq, repos=repolist)
+        df = cache.grabm(func=ctq, repos=repolist, columns=columns, categorical=True)
 
     # data ready.
     start = time.perf_counter()
@@ -265,12 +273,6 @@ def create_contrib_prolificacy_over_time_graph(
 
 def process_data(df, patterns, threshold, window_width, step_size, start_date, end_date):
 
-    # convert to datetime objects rather than strings
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-
-    # order values chronologically by created_at date
-    df = df.sort_values(by="created_at", ascending=True)
-
     # if the start_date and/or the end date is not specified set them to the beginning and most recent created_at date
     if start_date is None:
         start_date = df["created_at"].min()
@@ -293,20 +295,12 @@ def process_data(df, patterns, threshold, window_width, step_size, start_date, e
     # calculate the end of each interval and store the values in a column named period_from
     df_final["period_to"] = df_final["period_from"] + pd.DateOffset(months=window_width)
 
-    # dynamically calculate the contributor prolificacy over time for each of the action times and store results in df_final
-    (
-        df_final["Commit"],
-        df_final["Issue Opened"],
-        df_final["Issue Comment"],
-        df_final["Issue Closed"],
-        df_final["PR Opened"],
-        df_final["PR Comment"],
-        df_final["PR Review"],
-    ) = zip(
-        *df_final.apply(
-            lambda row: cntrb_prolificacy_over_time(df, row.period_from, row.period_to, window_width, threshold), axis=1
-        )
+    # contributor prolificacy of all windows and action types at once, NaN where there are no actions
+    factors = lottery_factors(
+        df["cntrb_id"], df["Action"], df["created_at"], df_final["period_from"], df_final["period_to"], threshold
     )
+    for action_type in ACTION_TYPES:
+        df_final[action_type] = factors.get(action_type, np.nan)
 
     return df_final
 
@@ -432,72 +426,3 @@ def create_figure(df_final, threshold, step_size):
     )
 
     return fig
-
-
-def cntrb_prolificacy_over_time(df, period_from, period_to, window_width, threshold):
-    # subset df such that the rows correspond to the window of time defined by period from and period to
-    time_mask = (df["created_at"] >= period_from) & (df["created_at"] <= period_to)
-    df_in_range = df.loc[time_mask]
-
-    # initialize varibles to store contributor prolificacy accoding to action type
-    commit, issueOpened, issueComment, issueClosed, prOpened, prReview, prComment = (
-        None,
-        None,
-        None,
-        None,
-        None,
-        None,
-        None,
-    )
-
-    # count the number of contributions each contributor has made according each action type
-    df_count_cntrbs = df_in_range.groupby(["Action", "cntrb_id"])["cntrb_id"].count().to_frame()
-    df_count_cntrbs = df_count_cntrbs.rename(columns={"cntrb_id": "count"}).reset_index()
-
-    # pivot df such that the column names correspond to the different action types, index is the cntrb_ids, and the values are the number of contributions of each contributor
-    df_count_cntrbs = df_count_cntrbs.pivot(index="cntrb_id", columns="Action", values="count")
-
-    commit = calc_lottery_factor(df_count_cntrbs, "Commit", threshold)
-    issueOpened = calc_lottery_factor(df_count_cntrbs, "Issue Opened", threshold)
-    issueComment = calc_lottery_factor(df_count_cntrbs, "Issue Comment", threshold)
-    issueClosed = calc_lottery_factor(df_count_cntrbs, "Issue Closed", threshold)
-    prOpened = calc_lottery_factor(df_count_cntrbs, "PR Opened", threshold)
-    prReview = calc_lottery_factor(df_count_cntrbs, "PR Review", threshold)
-    prComment = calc_lottery_factor(df_count_cntrbs, "PR Comment", threshold)
-
-    return commit, issueOpened, issueComment, issueClosed, prOpened, prReview, prComment
-
-
-def calc_lottery_factor(df, action_type, threshold):
-    # if the df is empty return None
-    if df.empty:
-        return None
-
-    # if the specified action type is not in the dfs' cols return None
-    if action_type not in df.columns:
-        return None
-
-    # sort rows in df based on number of contributions from greatest to least
-    df = df.sort_values(by=action_type, ascending=False)
-
-    # calculate the threshold amount of contributions
-    thresh_cntrbs = df[action_type].sum() * threshold
-
-    # drop rows where the cntrb_id is None
-    mask = df.index.get_level_values("cntrb_id") == None
-    df = df[~mask]
-
-    # initilize running sum of contributors who make up contributor prolificacy
-    lottery_factor = 0
-
-    # initialize running sum of contributions
-    running_sum = 0
-
-    for _, row in df.iterrows():
-        running_sum += row[action_type]  # update the running sum by the number of contributions a contributor has made
-        lottery_factor += 1  # update contributor prolificacy
-        # if the running sum of contributions is greater than or equal to the threshold amount, break
-        if running_sum >= thresh_cntrbs:
-            break
-
-    return lottery_factor
@@ -214,12 +214,16 @@ def graph_title(k, action_type):
     background=True,
 )
 def create_top_k_cntrbs_graph(repolist, action_type, top_k, patterns, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["cntrb_id", "created_at", "login", "Action"]
+    filters = [("created_at", ">=", start_date), ("created_at", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=ctq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=ctq, repos=repolist)
+        df = cache.grabm(func=ctq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -234,7 +238,7 @@ def create_top_k_cntrbs_graph(repolist, action_type, top_k, patterns, start_date
         return dash.no_update, True
 
     # function for all data pre processing
-    df = process_data(df, action_type, top_k, patterns, start_date, end_date)
+    df = process_data(df, action_type, top_k, patterns)
 
     fig = create_figure(df, action_type)
 
@@ -242,19 +246,10 @@ def create_top_k_cntrbs_graph(repolist, action_type, top_k, patterns, start_date
     return fig, False
 
 
-def process_data(df: pd.DataFrame, action_type, top_k, patterns, start_date, end_date):
-    # convert to datetime objects rather than strings
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-
+def process_data(df: pd.DataFrame, action_type, top_k, patterns):
     # order values chronologically by created_at date
     df = df.sort_values(by="created_at", ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.created_at >= start_date]
-    if end_date is not None:
-        df = df[df.created_at <= end_date]
-
     # subset the df such that it only contains rows where the Action column value is the action type
     df = df[df["Action"].str.contains(action_type)]
 
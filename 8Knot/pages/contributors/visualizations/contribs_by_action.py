@@ -159,7 +159,7 @@ def contribs_by_action_graph(repolist, interval, action):
     cache = cm()
     df = cache.grabm(func=ctq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=ctq, repos=repolist)
         df = cache.grabm(func=ctq, repos=repolist)
 
     start = time.perf_counter()
@@ -185,9 +185,6 @@ def contribs_by_action_graph(repolist, interval, action):
 
 def process_data(df: pd.DataFrame, interval, action):
 
-    # convert to datetime objects rather than strings
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-
     # order values chronologically by COLUMN_TO_SORT_BY date
     df = df.sort_values(by="created_at", axis=0, ascending=True)
 
@@ -142,7 +142,7 @@ def create_contrib_over_time_graph(repolist, contribs, interval):
     cache = cm()
     df = cache.grabm(func=ctq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=ctq, repos=repolist)
         df = cache.grabm(func=ctq, repos=repolist)
 
     start = time.perf_counter()
@@ -163,8 +163,7 @@ def create_contrib_over_time_graph(repolist, contribs, interval):
 
 
 def process_data(df, interval, contribs):
-    # convert to datetime objects with consistent column name
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    # consistent column name
     df.rename(columns={"created_at": "created"}, inplace=True)
 
     # remove null contrib ids
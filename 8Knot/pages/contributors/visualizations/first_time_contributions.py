@@ -82,7 +82,7 @@ def create_first_time_contributors_graph(repolist):
     cache = cm()
     df = cache.grabm(func=ctq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=ctq, repos=repolist)
         df = cache.grabm(func=ctq, repos=repolist)
 
     start = time.perf_counter()
@@ -103,8 +103,7 @@ def create_first_time_contributors_graph(repolist):
 
 
 def process_data(df):
-    # convert to datetime objects with consistent column name
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    # consistent column name
     df.rename(columns={"created_at": "created"}, inplace=True)
 
     # selection for 1st contribution only
@@ -7,7 +7,7 @@ import pandas as pd
 import logging
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
-from queries.contributors_query import contributors_query as ctq
+from queries.contributors_rollup_query import contributors_rollup_query as cnrq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
@@ -127,10 +127,10 @@ def graph_title(view):
 def new_contributor_graph(repolist, interval):
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=cnrq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=cnrq, repos=repolist)
+        df = cache.grabm(func=cnrq, repos=repolist)
 
     logging.warning("TOTAL_CONTRIBUTOR_GROWTH_VIZ - START")
     start = time.perf_counter()
@@ -150,9 +150,8 @@ def new_contributor_graph(repolist, interval):
 
 
 def process_data(df, interval):
-    # convert to datetime objects with consistent column name
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-    df.rename(columns={"created_at": "created"}, inplace=True)
+    # consistent column name
+    df.rename(columns={"day": "created"}, inplace=True)
 
     # order from beginning of time to most recent
     df = df.sort_values("created", axis=0, ascending=True)
@@ -164,7 +163,7 @@ def process_data(df, interval):
     """
 
     # keep only first contributions
-    df = df[df["rank"] == 1]
+    df = df[df["latest"]]
 
     # get all of the unique entries by contributor ID
     df.drop_duplicates(subset=["cntrb_id"], inplace=True)
@@ -186,17 +186,18 @@ def pr_count(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             count(distinct pr.pull_request_id) as num_open_prs
         from
             augur_data.pull_requests pr,
             augur_data.repo r
         where
-            r.repo_id in ({str(repolist)[1:-1]})
+            r.repo_id = ANY(:repo_ids)
             and pr.repo_id = r.repo_id
             and pr.pr_closed_at is null
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     return df.iat[0, 0]
@@ -223,17 +224,18 @@ def merged_pr_count(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             count(distinct pr.pull_request_id) as num_open_prs
         from
             augur_data.pull_requests pr,
             augur_data.repo r
         where
-            r.repo_id in ({str(repolist)[1:-1]})
+            r.repo_id = ANY(:repo_ids)
             and pr.repo_id = r.repo_id
             and pr.pr_merged_at is not null
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     return df.iat[0, 0]
@@ -260,18 +262,19 @@ def rejected_pr_count(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             count(distinct pr.pull_request_id) as num_open_prs
         from
             augur_data.pull_requests pr,
             augur_data.repo r
         where
-            r.repo_id in ({str(repolist)[1:-1]})
+            r.repo_id = ANY(:repo_ids)
             and pr.repo_id = r.repo_id
             and pr.pr_merged_at is null
             and pr.pr_closed_at is not null
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     return df.iat[0, 0]
@@ -298,17 +301,18 @@ def avg_open_pr_age(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             avg(now() - pr.pr_created_at) as difference
         from
             augur_data.pull_requests pr,
             augur_data.repo r
         where
-            r.repo_id in ({str(repolist)[1:-1]})
+            r.repo_id = ANY(:repo_ids)
             and pr.repo_id = r.repo_id
             and pr.pr_closed_at is null
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     # timedelta object
@@ -347,18 +351,19 @@ def avg_merged_pr_age(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             avg(pr.pr_merged_at - pr.pr_created_at) as difference
         from
             augur_data.pull_requests pr,
             augur_data.repo r
         where
-            r.repo_id in ({str(repolist)[1:-1]})
+            r.repo_id = ANY(:repo_ids)
             and pr.repo_id = r.repo_id
             and pr.pr_closed_at is not null
             and pr.pr_merged_at is not null
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     # timedelta object
@@ -397,7 +402,7 @@ def rejected_pr_count(repolist):
 
     # run query
     df = db.run_query(
-        f"""
+        """
         select
             avg(prmc.message_count) as avg_message_count
         from
@@ -411,12 +416,13 @@ def rejected_pr_count(repolist):
                 augur_data.pull_request_message_ref prmr,
                 augur_data.repo r
             where
-                r.repo_id in ({str(repolist)[1:-1]})
+                r.repo_id = ANY(:repo_ids)
                 and pr.repo_id = r.repo_id
                 and prmr.pull_request_id = pr.pull_request_id
             group by pr.pull_request_id
             ) as prmc
-        """
+        """,
+        params={"repo_ids": repolist},
     )
 
     return round(df.iat[0, 0], 2)
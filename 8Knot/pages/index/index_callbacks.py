@@ -4,12 +4,13 @@ import os
 import time
 import logging
 import json
-from celery.result import AsyncResult
+from celery import group, uuid
+from celery.result import AsyncResult, GroupResult
 import dash_bootstrap_components as dbc
 import dash
 from dash import callback
 from dash.dependencies import Input, Output, State
-from app import augur
+from app import augur, celery_app
 from flask_login import current_user
 from cache_manager.cache_manager import CacheManager as cm
 from queries.issues_query import issues_query as iq
@@ -22,12 +23,51 @@ from queries.issue_assignee_query import issue_assignee_query as iaq
 from queries.user_groups_query import user_groups_query as ugq
 from queries.pr_response_query import pr_response_query as prr
 from queries.release_query import release_query as rlq
+from queries.commits_rollup_query import commits_rollup_query as crq
+from queries.contributors_rollup_query import contributors_rollup_query as cnrq
+from queries.issues_rollup_query import issues_rollup_query as irq
+from queries.contributor_actions_scan_query import contributor_actions_scan_query as cnsq
+from queries.pull_requests_scan_query import pull_requests_scan_query as prsq
+from queries.query_utils import chunk_by_cost
 import redis
 import flask
 
 
 # list of queries to be run
-QUERIES = [iq, cq, cnq, prq, cmq, iaq, praq, prr, rlq]
+QUERIES = [iq, cq, cnq, prq, cmq, iaq, praq, prr, rlq, crq, cnrq, irq]
+
+# queries that fetch the results of several queries in 'cached_queries' with one scan
+SHARED_SCANS = [cnsq, prsq]
+
+# queries that can refresh their cached results from a watermark. contributors and
+# company aren't: an action's rank is renumbered by every later action of its
+# contributor, so cached rows can't be kept when new ones are merged in.
+INCREMENTAL_QUERIES = [iq, cq, prq, rlq]
+
+# seconds before cached results are refreshed with new rows, 0 disables refreshes
+REFRESH_INTERVAL = int(os.getenv("CACHE_REFRESH_INTERVAL", 24 * 60 * 60))
+
+# large selections are split over up to this many parallel tasks per query, 1 disables fan-out
+FANOUT_MAX_CHUNKS = int(os.getenv("QUERY_FANOUT_MAX_CHUNKS", 8))
+
+# fewest repos worth giving their own task
+FANOUT_MIN_REPOS = int(os.getenv("QUERY_FANOUT_MIN_REPOS", 10))
+
+# queues of the query workers: interactive requests, and bulk loads that
+# would otherwise hold the interactive workers up for minutes
+INTERACTIVE_QUEUE = "data"
+BULK_QUEUE = "data_bulk"
+
+# queries for at least this many repos, or this many cached bytes last time, are bulk loads
+BULK_MIN_REPOS = int(os.getenv("QUERY_BULK_MIN_REPOS", 25))
+BULK_MIN_BYTES = int(os.getenv("QUERY_BULK_MIN_BYTES", 32 * 1024 * 1024))
+
+# most requested repos and orgs kept warm by 'prewarm_cache', and the budget of repos it may queue
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", 20))
+PREWARM_MAX_REPOS = int(os.getenv("PREWARM_MAX_REPOS", 500))
+
+# request counts are scaled by this after each prewarm, so popularity follows recent use
+PREWARM_DECAY = float(os.getenv("PREWARM_DECAY", 0.5))
 
 # check if login has been enabled in config
 login_enabled = os.getenv("AUGUR_LOGIN_ENABLED", "False") == "True"
@@ -280,6 +320,12 @@ def multiselect_values_to_repo_ids(n_clicks, user_vals):
     all_repo_ids = list(set().union(*[repos, org_repos, group_repos]))
     logging.warning(f"SELECTED_REPOS: {all_repo_ids}")
 
+    # count the request towards what's kept warm, user groups are private
+    try:
+        cm().record_requests([f"repo:{r}" for r in repos] + [f"org:{o}" for o in names if augur.is_org(o)])
+    except redis.exceptions.ConnectionError:
+        logging.error("SEARCH-BUTTON: Could not record request popularity.")
+
     return "", all_repo_ids
 
 
@@ -340,9 +386,28 @@ def show_help_alert(n_clicks, openness, repo_ids):
     background=True,
 )
 def wait_queries(job_ids):
-    # TODO add docstring to function
+    """
+    Waits for the query jobs started by 'run_queries' and
+    reports whether the data they cache is ready.
+
+    Queries that were fanned out over several tasks are a single
+    job id of a saved GroupResult, which succeeds once all of its
+    tasks have.
+
+    Jobs can be shared with other requests for the same repos, so
+    a job's result is only forgotten by the last request waiting on it.
+
+    Args:
+        job_ids ([str]): ids of AsyncResults or saved GroupResults
+    """
+
+    cache = cm()
+
+    jobs = [GroupResult.restore(j_id) or AsyncResult(j_id) for j_id in job_ids]
 
-    jobs = [AsyncResult(j_id) for j_id in job_ids]
+    def forget(j):
+        if cache.release_job(j.id) <= 0:
+            j.forget()
 
     # default 'result_expires' for celery config is 86400 seconds.
     # so we don't have to check if the jobs exist. if this tasks
@@ -356,7 +421,7 @@ def wait_queries(job_ids):
         # jobs are either all ready
         if all(j.successful() for j in jobs):
             logging.warning([j.status for j in jobs])
-            jobs = [j.forget() for j in jobs]
+            jobs = [forget(j) for j in jobs]
             return "Data Ready", "#b5b683"
 
         # or one of them has failed
@@ -376,13 +441,142 @@ def wait_queries(job_ids):
 
                 time.sleep(4.0)
 
-            jobs = [j.forget() for j in jobs]
+            jobs = [forget(j) for j in jobs]
             return "Data Incomplete- Retry", "danger"
 
         # pause to let something change
         time.sleep(2.0)
 
 
+def query_queue(repos, costs):
+    """
+    Picks the queue a query is run from by its estimated cost,
+    so that bulk loads don't wait in front of interactive requests.
+
+    Args:
+        repos ([int]): repositories the query runs for
+        costs ([float]): estimated cost per repo, see CacheManager.repo_costs
+
+    Returns:
+        str: BULK_QUEUE for queries of many or expensive repos, INTERACTIVE_QUEUE otherwise
+    """
+    if len(repos) >= BULK_MIN_REPOS or sum(costs) >= BULK_MIN_BYTES:
+        return BULK_QUEUE
+    return INTERACTIVE_QUEUE
+
+
+def dispatch_query(f, repos, cache, job_id=None, queue=None, **kwargs):
+    """
+    Queues query f for repos on the queue 'query_queue' picks for it.
+
+    Selections of at least 2 * FANOUT_MIN_REPOS repos are split into
+    chunks of about equal estimated cost and run as a group of
+    parallel tasks, so that the query workers share the work.
+
+    Args:
+        f (celery task): query to run
+        repos ([int]): repositories to run it for
+        cache (CacheManager): source of cost estimates
+        job_id (str): id the task or group is created with
+        queue (str | None): queue to use instead of the one 'query_queue' picks
+        kwargs: passed to the query
+
+    Returns:
+        AsyncResult | GroupResult: promise of the query's task(s), groups are saved
+            so they can be restored from their id.
+    """
+    # shared scans cost what the queries they cache do together
+    costs = [sum(c) for c in zip(*(cache.repo_costs(q, repos) for q in getattr(f, "cached_queries", [f])))]
+    queue = queue or query_queue(repos, costs)
+
+    num_chunks = min(FANOUT_MAX_CHUNKS, len(repos) // FANOUT_MIN_REPOS)
+    if num_chunks < 2:
+        return f.apply_async(args=[repos], kwargs=kwargs, queue=queue, task_id=job_id)
+
+    chunks = chunk_by_cost(repos, costs, num_chunks)
+
+    # a group's task_id becomes its group id
+    job = group(f.s(chunk, **kwargs) for chunk in chunks).apply_async(queue=queue, task_id=job_id)
+    job.save()
+
+    return job
+
+
+def queue_queries(repos, cache, queue=None):
+    """
+    Queues the queries in QUERIES for the repos whose results
+    aren't cached, or are due for a refresh.
+
+    Cached results of INCREMENTAL_QUERIES that haven't been refreshed in
+    REFRESH_INTERVAL seconds are refreshed incrementally with the rows that are new
+    since their watermark.
+
+    Repos that another request is already fetching aren't queued
+    again, the jobs fetching them are returned instead.
+
+    Queries in SHARED_SCANS fetch the repos that are missing for any
+    of their cached queries, which then aren't queued on their own.
+
+    Args:
+        repos ([int]): repositories we collect data for.
+        cache (CacheManager): cache the results are written to
+        queue (str | None): queue to use instead of the one 'query_queue' picks
+
+    Returns:
+        [str]: ids of the jobs that fetch the repos
+    """
+
+    # ids of jobs, queued here or already fetching repos for another request
+    job_ids = []
+
+    # repos fetched by a shared scan, per query it caches
+    scanned = {}
+
+    # leases outlive the query's wait in whichever queue it's sent to
+    ttl = cache.queued_lease_ttl([INTERACTIVE_QUEUE, BULK_QUEUE])
+
+    for s in SHARED_SCANS:
+        missing = [r for r in repos if any(cache.exists(f, r) != 1 for f in s.cached_queries)]
+
+        # the scan fetches a repo if it could claim it for any of its queries
+        job_id = uuid()
+        claimed = set()
+        for f in s.cached_queries:
+            c, fetching = cache.claim_inflight(f, missing, job_id, ttl=ttl)
+            claimed.update(c)
+            job_ids.extend(fetching)
+            scanned[f] = set(missing)
+
+        claimed = [r for r in missing if r in claimed]
+        if claimed:
+            dispatch_query(s, claimed, cache, job_id=job_id, queue=queue)
+            job_ids.append(job_id)
+
+    for f in QUERIES:
+        # only download repos that aren't currently in cache
+        missing = [r for r in repos if cache.exists(f, r) != 1]
+        not_ready = [r for r in missing if r not in scanned.get(f, ())]
+
+        # cached repos that are due for a refresh only query their new rows
+        stale = []
+        if REFRESH_INTERVAL and f in INCREMENTAL_QUERIES:
+            cached = [r for r in repos if r not in missing]
+            stale = cache.stale(f, cached, max_age=REFRESH_INTERVAL)
+
+        for todo, kwargs in ((not_ready, {}), (stale, {"incremental": True})):
+            # attach to jobs that are already fetching some of the repos
+            job_id = uuid()
+            claimed, fetching = cache.claim_inflight(f, todo, job_id, ttl=ttl)
+            job_ids.extend(fetching)
+
+            if claimed:
+                # add job to queue
+                dispatch_query(f, claimed, cache, job_id=job_id, queue=queue, **kwargs)
+                job_ids.append(job_id)
+
+    return list(dict.fromkeys(job_ids))
+
+
 @callback(
     Output("job-ids", "data"),
     Input("repo-choices", "data"),
@@ -393,6 +587,9 @@ def run_queries(repos):
     instance for input Repos; caches results in redis per
     (query_function,repo) pair.
 
+    Queries are queued by 'queue_queries', the returned jobs
+    include the ones already fetching repos for other requests.
+
     Args:
         repos ([int]): repositories we collect data for.
     """
@@ -400,20 +597,53 @@ def run_queries(repos):
     # cache manager object
     cache = cm()
 
-    # list of queries to process
-    funcs = QUERIES
+    job_ids = queue_queries(repos, cache)
+    cache.hold_jobs(job_ids)
 
-    # list of job promises
-    jobs = []
+    # a job forgotten before it was held has no result to wait on,
+    # queueing again takes its leases over and fetches its repos anew
+    forgotten = cache.forgotten_jobs(job_ids)
+    if forgotten:
+        job_ids = [j for j in job_ids if j not in forgotten]
+        requeued = [j for j in queue_queries(repos, cache) if j not in job_ids]
+        cache.hold_jobs(requeued)
+        job_ids += requeued
 
-    for f in funcs:
-        # only download repos that aren't currently in cache
-        not_ready = [r for r in repos if cache.exists(f, r) != 1]
+    return job_ids
+
+
+@celery_app.task
+def prewarm_cache():
+    """
+    (Worker Query)
+    Keeps the results of the most requested repos and orgs cached,
+    so typical sessions don't wait on the database.
+
+    Run by Celery beat in the PREWARM_HOURS window. Queues the queries of
+    the PREWARM_TOP_N most requested repos and orgs, up to PREWARM_MAX_REPOS
+    repos, on the bulk queue. Results that are cached and fresh are skipped
+    and stale ones refreshed incrementally, like in 'run_queries'.
+    Request counts are decayed afterwards so popularity follows recent use.
+
+    Returns:
+        [str]: ids of the jobs that fetch the repos
+    """
+    cache = cm()
+
+    repos = []
+    for member in cache.most_requested(PREWARM_TOP_N):
+        kind, name = member.split(":", 1)
+        if kind == "repo":
+            repos.append(int(name))
+        elif kind == "org" and augur.is_org(name):
+            repos.extend(augur.org_to_repos(name))
+
+    # most requested first, until the budget is used up
+    repos = list(dict.fromkeys(repos))[:PREWARM_MAX_REPOS]
+    logging.warning(f"PREWARM: {len(repos)} REPOS")
 
-        # add job to queue
-        j = f.apply_async(args=[not_ready], queue="data")
+    job_ids = queue_queries(repos, cache, queue=BULK_QUEUE)
 
-        # add job promise to local promise list
-        jobs.append(j)
+    cache.decay_requests(PREWARM_DECAY)
 
-    return [j.id for j in jobs]
+    return job_ids
@@ -204,12 +204,16 @@ def graph_title(k):
     background=True,
 )
 def bus_factor_graph(repolist, start_date, end_date):
+    # only the columns and date window this graph uses are decoded from the cache.
+    columns = ["author_email", "date"]
+    filters = [("date", ">=", start_date), ("date", "<=", end_date)]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=ctq, repos=repolist)
+    df = cache.grabm(func=ctq, repos=repolist, columns=columns, filters=filters)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=ctq, repos=repolist)
+        cache.wait_ready(func=ctq, repos=repolist)
+        df = cache.grabm(func=ctq, repos=repolist, columns=columns, filters=filters)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -220,7 +224,7 @@ def bus_factor_graph(repolist, start_date, end_date):
         return nodata_graph, False
 
     # function for all data pre processing
-    df = process_data(df, start_date, end_date)
+    df = process_data(df)
 
     fig = create_figure(df)
 
@@ -228,19 +232,13 @@ def bus_factor_graph(repolist, start_date, end_date):
     return fig
 
 
-def process_data(df: pd.DataFrame, start_date, end_date):
+def process_data(df: pd.DataFrame):
     # convert to datetime objects rather than strings
     df["date"] = pd.to_datetime(df["date"], utc=True)
 
     # order values chronologically by created_at date
     df = df.sort_values(by="date", ascending=True)
 
-    # filter values based on date picker
-    if start_date is not None:
-        df = df[df.date >= start_date]
-    if end_date is not None:
-        df = df[df.date <= end_date]
-
     # Extract month from the 'date' column
     df['month'] = df['date'].dt.to_period('M')
 
@@ -10,6 +10,7 @@ import logging
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 import io
 from pages.utils.job_utils import nodata_graph
+from pages.utils.interval_utils import open_counts
 from queries.prs_query import prs_query as prq
 from cache_manager.cache_manager import CacheManager as cm
 import time
@@ -120,12 +121,15 @@ def change_req_closure_ratio_graph(
     repolist, interval
 ):
 
+    # only the columns this graph uses are decoded from the cache.
+    columns = ["created", "closed"]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df = cache.grabm(func=prq, repos=repolist)
+    df = cache.grabm(func=prq, repos=repolist, columns=columns)
     while df is None:
-        time.sleep(1.0)
-        df = cache.grabm(func=prq, repos=repolist)
+        cache.wait_ready(func=prq, repos=repolist)
+        df = cache.grabm(func=prq, repos=repolist, columns=columns)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
@@ -149,13 +153,6 @@ def process_data(
     interval
 ):
 
-    # convert dates to datetime objects rather than strings
-    df["created"] = pd.to_datetime(df["created"], utc=True)
-    df["closed"] = pd.to_datetime(df["closed"], utc=True)
-
-    # order values chronologically by creation date
-    df = df.sort_values(by="created", axis=0, ascending=True)
-
     # variable to slice on to handle weekly period edge case
     period_slice = None
     if interval == "W":
@@ -205,14 +202,15 @@ def process_data(
     # df for open prs from time interval
     df_open = dates.to_frame(index=False, name="Date")
 
-    # aplies function to get the amount of open prs for each day
-    df_open["Open"] = df_open.apply(lambda row: get_open(df, row.Date), axis=1)
+    # amount of open prs for each date
+    df_open["Open"] = open_counts(df["created"], df["closed"], dates)
 
     df_open["Date"] = df_open["Date"].dt.strftime("%Y-%m-%d")
 
+    # closed prs over open prs, 0 when none are open
     df_ratio = dates.to_frame(index=False, name="Date")
     df_ratio["closed"] = df_closed["closed"]
-    df_ratio["Ratio"] = df_ratio.apply(lambda row: get_ratio(df, row.closed, row.Date), axis=1)
+    df_ratio["Ratio"] = (df_ratio["closed"] / df_open["Open"]).where(df_open["Open"] > 0, 0)
     df_ratio["Date"] = df_ratio["Date"].dt.strftime("%Y-%m-%d")
     return df_open, df_closed, df_ratio
 
@@ -275,36 +273,3 @@ def create_figure(
     )
 
     return fig
-
-# for each day, this function calculates the amount of open prs
-def get_open(df, date):
-    # drop rows that are more recent than the date limit
-    df_created = df[df["created"] <= date]
-
-    # drops rows that have been closed after date
-    df_open = df_created[df_created["closed"] > date]
-
-    # include prs that have not been close yet
-    df_open = pd.concat([df_open, df_created[df_created.closed.isnull()]])
-
-    # generates number of columns ie open prs
-    num_open = df_open.shape[0]
-    return num_open
-
-def get_ratio(df, num_closed, date):
-    # drop rows that are more recent than the date limit
-    df_created = df[df["created"] <= date]
-
-    # drops rows that have been closed after date
-    df_open = df_created[df_created["closed"] > date]
-
-    # include prs that have not been close yet
-    df_open = pd.concat([df_open, df_created[df_created.closed.isnull()]])
-
-    # generates number of columns ie open prs
-    num_open = df_open.shape[0]
-    try:
-        num_ratio = num_closed / num_open
-    except ZeroDivisionError:
-        num_ratio = 0
-    return num_ratio
@@ -124,7 +124,7 @@ def release_freq_graph(
     cache = cm()
     df = cache.grabm(func=rlq, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=rlq, repos=repolist)
         df = cache.grabm(func=rlq, repos=repolist)
 
     start = time.perf_counter()
@@ -149,9 +149,6 @@ def process_data(
     interval
 ):
 
-    # convert dates to datetime objects rather than strings
-    df["releasedate"] = pd.to_datetime(df["releasedate"], utc=True)
-
     # order values chronologically by creation date
     df = df.sort_values(by="releasedate", axis=0, ascending=True)
 
@@ -11,10 +11,10 @@ from dateutil.relativedelta import *  # type: ignore
 import plotly.express as px
 from pages.utils.graph_utils import get_graph_time_values, color_seq
 from queries.pr_response_query  import pr_response_query as prrq
-from queries.prs_query          import prs_query    as prsq
 import io
 from cache_manager.cache_manager import CacheManager as cm
 from pages.utils.job_utils import nodata_graph
+from pages.utils.response_utils import first_responses
 import time
 import datetime as dt
 
@@ -211,23 +211,24 @@ def graph_title(action_type):
     background=True,
 )
 def bus_factor_graph(repolist):
+    # only the columns this graph uses are decoded from the cache.
+    columns = ["pull_request_id", "cntrb_id", "msg_cntrb_id", "msg_timestamp", "pr_created_at"]
+
     # wait for data to asynchronously download and become available.
     cache = cm()
-    df1 = cache.grabm(func=prrq, repos=repolist)
-    df2 = cache.grabm(func=prsq, repos=repolist)
-    while df1 is None or df2 is None:
-        time.sleep(1.0)
-        df1 = cache.grabm(func=prrq, repos=repolist)
-        df2 = cache.grabm(func=prsq, repos=repolist)
+    df = cache.grabm(func=prrq, repos=repolist, columns=columns)
+    while df is None:
+        cache.wait_ready(func=prrq, repos=repolist)
+        df = cache.grabm(func=prrq, repos=repolist, columns=columns)
 
     start = time.perf_counter()
     logging.warning(f"{VIZ_ID}- START")
     # test if there is data
-    if df1.empty or df2.empty:
+    if df.empty:
         logging.warning(f"{VIZ_ID} - NO DATA AVAILABLE")
         return nodata_graph, False
     # function for all data pre processing
-    df = process_data(df1,df2)
+    df = process_data(df)
 
     fig = create_figure(df)
 
@@ -235,21 +236,15 @@ def bus_factor_graph(repolist):
     return fig
 
 
-def process_data(df1: pd.DataFrame, df2: pd.DataFrame,):
-    df1['msg_timestamp'] = pd.to_datetime(df1['msg_timestamp'])
-    df2['created'] = pd.to_datetime(df2['created'])
-    
-    # Get the first response
-    df1_sorted = df1.sort_values(by=['msg_timestamp'], ascending=False).groupby('pull_request_id').first().reset_index()
-
-    # Merge dataframes on 'pull_request_id'
-    merged_df = pd.merge(df1_sorted, df2, how='inner', left_on='pull_request_id', right_on='pull_request')
+def process_data(df: pd.DataFrame):
+    # Get the first response from someone other than the pr's creator, one row per pr
+    prs = first_responses(df)
 
     # Calculate the time difference in hours
-    merged_df['time_difference_hours'] = (merged_df['msg_timestamp'] - merged_df['created']).dt.total_seconds() / 3600
+    prs['time_difference_hours'] = (prs['first_response'] - prs['pr_created_at']).dt.total_seconds() / 3600
 
     # Group by the month of creation and calculate the average time difference
-    result_df = merged_df.groupby(merged_df['created'].dt.to_period("M"))['time_difference_hours'].mean().reset_index()
+    result_df = prs.groupby(prs['pr_created_at'].dt.to_period("M"))['time_difference_hours'].mean().reset_index()
 
     # Rename the columns for clarity
     result_df.columns = ['Month', 'Average_Time_Difference_Hours']
@@ -0,0 +1,252 @@
+"""
+Counts of items that are open over an interval of time, e.g. pull requests
+between their creation and closing, for every date of a date range at once.
+
+Items are intervals of int64 nanosecond timestamps. Sorting the interval
+starts and ends once turns "how many items contain date t" into two binary
+searches per date, so a series over D dates of N items costs
+O((N + D) log N) rather than a pass over all items per date.
+
+Where the interval depends on thresholds that vary by date, e.g. a
+number of months before each date, the thresholds are monotonic in the
+date, so each item maps to a contiguous range of date indices instead,
+and the ranges are counted with a cumulative sum.
+"""
+import numpy as np
+import pandas as pd
+
+# end of the intervals of items that haven't been closed
+_NEVER = np.iinfo(np.int64).max
+
+
+def to_ns(values):
+    """
+    Converts timestamps to int64 nanoseconds since the epoch in UTC.
+
+    Args:
+    -----
+        values (pd.Series | pd.DatetimeIndex): timestamps, naive ones are taken as UTC.
+
+    Returns:
+    --------
+        (np.ndarray, np.ndarray): nanoseconds, and mask of the values that are NaT.
+    """
+    values = pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    return values.asi8, np.asarray(values.isna())
+
+
+def count_containing(starts, ends, dates):
+    """
+    Counts the intervals [start, end] that contain each date.
+
+    Intervals that end before they start contain no date.
+
+    Args:
+    -----
+        starts (np.ndarray): int64 first instant of each interval.
+        ends (np.ndarray): int64 last instant of each interval, inclusive.
+        dates (np.ndarray): int64 instants to count at, in any order.
+
+    Returns:
+    --------
+        np.ndarray: number of intervals containing each date.
+    """
+    valid = starts <= ends
+    starts = np.sort(starts[valid])
+    ends = np.sort(ends[valid])
+
+    # started at or before the date, minus those that also ended before it
+    return np.searchsorted(starts, dates, side="right") - np.searchsorted(ends, dates, side="left")
+
+
+def open_counts(created, closed, dates):
+    """
+    Counts the items open at each date.
+
+    An item is open at date t if it was created at or before t and isn't
+    closed by t. Each creation is a +1 at the first date at or after it
+    and each closing a -1 at the first date at or after it, the counts
+    are the cumulative sum of these deltas over the dates. Items closed
+    before they were created are never open.
+
+    Args:
+    -----
+        created (pd.Series): creation timestamps, items without one are never open.
+        closed (pd.Series): closing timestamps, NaT for items still open.
+        dates (pd.DatetimeIndex): dates to count at, ascending.
+
+    Returns:
+    --------
+        np.ndarray: number of open items per date.
+    """
+    created, no_created = to_ns(created)
+    closed, still_open = to_ns(closed)
+    t, _ = to_ns(dates)
+
+    # index of the first date each item is open at, and of the first it isn't
+    opens = np.searchsorted(t, created[~no_created], side="left")
+    closes = np.searchsorted(t, closed[~no_created], side="left")
+    closes[still_open[~no_created]] = len(t)
+
+    return _count_ranges(opens, closes, len(t))
+
+
+def new_staling_stale_counts(created, closed, dates, staling_interval, stale_interval):
+    """
+    Counts the items open at each date by how long ago they were created.
+
+    An item is open at date t if it was created at or before t and
+    isn't closed by t. Open items are:
+        new: created at or after t - staling_interval days.
+        staling: created after t - stale_interval days and before t - staling_interval days.
+        stale: all other open items.
+
+    Each class is the set of dates in an interval per item, e.g. an item
+    is new from its creation until staling_interval days later or until
+    it is closed, whichever is first.
+
+    Args:
+    -----
+        created (pd.Series): creation timestamps, items without one are never open.
+        closed (pd.Series): closing timestamps, NaT for items still open.
+        dates (pd.DatetimeIndex): dates to count at.
+        staling_interval (int): days after which an open item is staling.
+        stale_interval (int): days after which an open item is stale.
+
+    Returns:
+    --------
+        (np.ndarray, np.ndarray, np.ndarray): new, staling and stale items per date.
+    """
+    created, no_created = to_ns(created)
+    closed, still_open = to_ns(closed)
+
+    # last instant an item is open at
+    open_until = closed.copy()
+    open_until[~still_open] -= 1
+    open_until[still_open] = _NEVER
+
+    created = created[~no_created]
+    open_until = open_until[~no_created]
+
+    t, _ = to_ns(dates)
+    staling = pd.Timedelta(days=staling_interval).value
+    stale = pd.Timedelta(days=stale_interval).value
+
+    num_open = count_containing(created, open_until, t)
+    num_new = count_containing(created, np.minimum(created + staling, open_until), t)
+    num_staling = count_containing(
+        np.maximum(created, created + staling + 1),
+        np.minimum(created + stale - 1, open_until),
+        t,
+    )
+
+    return num_new, num_staling, num_open - num_new - num_staling
+
+
+def _count_ranges(lo, hi, size):
+    """
+    (private)
+    Counts the index ranges [lo, hi) that cover each index of 0..size-1.
+
+    Args:
+    -----
+        lo (np.ndarray): first index of each range.
+        hi (np.ndarray): index after the last of each range, at most size.
+        size (int): number of indices.
+
+    Returns:
+    --------
+        np.ndarray: number of ranges covering each index.
+    """
+    keep = lo < hi
+    delta = np.bincount(lo[keep], minlength=size + 1) - np.bincount(hi[keep], minlength=size + 1)
+    return np.cumsum(delta[:size])
+
+
+def last_activity_spans(keys, times):
+    """
+    For each distinct activity of each key, e.g. each day a contributor
+    was active on, the span of time it is that key's latest activity:
+    from the activity until the key's next one.
+
+    Activities without a time are left out. Null keys are one key,
+    like in drop_duplicates.
+
+    Args:
+    -----
+        keys (pd.Series): key of each activity, e.g. cntrb_id.
+        times (pd.Series): timestamp of each activity.
+
+    Returns:
+    --------
+        (np.ndarray, np.ndarray): int64 start of each span, and its end,
+            exclusive, which is never for a key's latest activity.
+    """
+    times, missing = to_ns(times)
+    codes = pd.factorize(np.asarray(keys, dtype=object))[0][~missing]
+    times = times[~missing]
+
+    # each key's activities in chronological order
+    order = np.lexsort((times, codes))
+    codes = codes[order]
+    times = times[order]
+
+    # activities at the same instant are the same span
+    distinct = np.ones(len(times), dtype=bool)
+    distinct[1:] = (codes[1:] != codes[:-1]) | (times[1:] != times[:-1])
+    codes = codes[distinct]
+    times = times[distinct]
+
+    ends = np.full(len(times), _NEVER)
+    followed = codes[1:] == codes[:-1]
+    ends[:-1][followed] = times[1:][followed]
+
+    return times, ends
+
+
+def active_drifting_away_counts(keys, times, dates, drift_interval, away_interval):
+    """
+    Counts the keys seen by each date by how long ago their latest activity was.
+
+    Of the keys with an activity at or before date t, with latest such activity l:
+        active: l at or after t - drift_interval months.
+        drifting: l after t - away_interval months and before t - drift_interval months.
+        away: all others.
+
+    The spans of latest activity don't depend on the intervals, only the
+    monthly thresholds of each date do, so changing them costs two binary
+    searches per span.
+
+    Args:
+    -----
+        keys (pd.Series): key of each activity, e.g. cntrb_id.
+        times (pd.Series): timestamp of each activity.
+        dates (pd.DatetimeIndex): dates to count at, ascending.
+        drift_interval (int): months after which a key is drifting.
+        away_interval (int): months after which a key is away.
+
+    Returns:
+    --------
+        (np.ndarray, np.ndarray, np.ndarray): active, drifting and away keys per date.
+    """
+    starts, ends = last_activity_spans(keys, times)
+
+    t, _ = to_ns(dates)
+    # calendar months, like relativedelta, so the thresholds are ascending as well
+    drift, _ = to_ns(dates - pd.DateOffset(months=drift_interval))
+    away, _ = to_ns(dates - pd.DateOffset(months=away_interval))
+
+    # dates at which each span is a key's latest activity
+    lo = np.searchsorted(t, starts, side="left")
+    hi = np.searchsorted(t, ends, side="left")
+
+    # dates whose drift threshold is at or before the activity, a prefix of the dates
+    active_until = np.searchsorted(drift, starts, side="right")
+    # dates whose away threshold is before the activity
+    drifting_until = np.searchsorted(away, starts, side="left")
+
+    num_seen = _count_ranges(lo, hi, len(t))
+    num_active = _count_ranges(lo, np.minimum(hi, active_until), len(t))
+    num_drifting = _count_ranges(np.maximum(lo, active_until), np.minimum(hi, drifting_until), len(t))
+
+    return num_active, num_drifting, num_seen - num_active - num_drifting
@@ -0,0 +1,97 @@
+"""
+Lottery factor of sliding windows of time: the fewest contributors that
+together made a given share of the contributions in the window.
+
+The windows' boundaries split time into cells. Contributions are counted
+per contributor and cell once, sorted by cell, so the contributions of a
+window are one slice of the counts. A window's counts per contributor
+are then a bincount of its slice, and its lottery factor a sort, a
+cumulative sum and a binary search, rather than a groupby, pivot and
+loop over contributors per window.
+"""
+import numpy as np
+import pandas as pd
+from pages.utils.interval_utils import to_ns
+
+
+def lottery_factors(keys, groups, times, starts, ends, threshold):
+    """
+    Computes the lottery factor of each group of contributions in each window.
+
+    In a window [start, end], the contributors are ranked by their number
+    of contributions of the group, and the lottery factor is the number of
+    top ranked contributors whose contributions add up to at least
+    'threshold' of the group's contributions in the window.
+
+    Contributions without contributor, group or time aren't counted.
+    Categorical keys and groups are factorized without hashing strings.
+
+    Args:
+    -----
+        keys (pd.Series): contributor of each contribution, e.g. cntrb_id.
+        groups (pd.Series): group of each contribution, e.g. its Action.
+        times (pd.Series): timestamp of each contribution.
+        starts (pd.Series): first instant of each window, ascending.
+        ends (pd.Series): last instant of each window, inclusive, ascending.
+        threshold (float): share of the contributions, between 0 and 1.
+
+    Returns:
+    --------
+        dict[str, np.ndarray]: lottery factor per window by group, integers
+            unless some windows have no contributions of the group, which are NaN.
+    """
+    key_codes, key_names = pd.factorize(keys)
+    group_codes, group_names = pd.factorize(groups)
+    times, missing = to_ns(times)
+
+    valid = ~missing & (key_codes >= 0) & (group_codes >= 0)
+    key_codes, group_codes, times = key_codes[valid], group_codes[valid], times[valid]
+
+    num_windows = len(starts)
+    result = {name: np.full(num_windows, np.nan) for name in group_names}
+    if len(times) == 0 or num_windows == 0:
+        return result
+
+    # (group, contributor) pairs as one code, grouped by group
+    num_keys = len(key_names)
+    num_pairs = num_keys * len(group_names)
+    pairs = group_codes.astype(np.int64) * num_keys + key_codes
+
+    # cells between consecutive window boundaries, a window covers
+    # the cells from its start up to the instant after its end
+    lo, _ = to_ns(starts)
+    hi, _ = to_ns(ends)
+    edges = np.unique(np.concatenate([lo, hi + 1]))
+    cells = np.searchsorted(edges, times, side="right") - 1
+
+    # contributions per cell and pair, counted once, in order of cell
+    cell_pairs, counts = np.unique(cells * num_pairs + pairs, return_counts=True)
+    cells, pairs = np.divmod(cell_pairs, num_pairs)
+
+    # each window's slice of the counts
+    rows_from = np.searchsorted(cells, np.searchsorted(edges, lo))
+    rows_to = np.searchsorted(cells, np.searchsorted(edges, hi + 1))
+
+    for i in range(num_windows):
+        window = slice(rows_from[i], rows_to[i])
+        if window.start == window.stop:
+            continue
+
+        # contributions of each contributor in the window, a row per group
+        per_key = np.bincount(pairs[window], weights=counts[window], minlength=num_pairs)
+        per_key = per_key.reshape(len(group_names), num_keys)
+
+        for g, name in enumerate(group_names):
+            contributions = per_key[g][per_key[g] > 0]
+            if len(contributions) == 0:
+                continue
+
+            # fewest top contributors whose running sum reaches the threshold
+            running = np.cumsum(np.sort(contributions)[::-1])
+            result[name][i] = np.searchsorted(running, running[-1] * threshold, side="left") + 1
+
+    for name, factors in result.items():
+        if not np.isnan(factors).any():
+            result[name] = factors.astype(np.int64)
+
+    return result
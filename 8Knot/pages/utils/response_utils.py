@@ -0,0 +1,68 @@
+"""
+First responses to pull requests, from the results of pr_response_query.
+
+pr_response_query has a row per message in response to a pull request,
+or one row for pull requests without any. Collapsing them once to a row
+per pull request with the time of its first response leaves a frame
+whose size doesn't depend on the number of messages, and a pull request
+responded to within a number of days is a comparison on that row, so
+changing the number of days doesn't touch the messages again.
+"""
+import numpy as np
+import pandas as pd
+from pages.utils.interval_utils import open_counts
+
+
+def first_responses(df):
+    """
+    Collapses pr_response_query's rows to one row per pull request
+    with the time of its first response.
+
+    Messages from the pull request's author aren't responses. Pull requests
+    without any other message have no first response, NaT.
+
+    Args:
+    -----
+        df (pd.DataFrame): rows of pr_response_query, with at least the columns
+            pull_request_id, cntrb_id, msg_cntrb_id, msg_timestamp and pr_created_at.
+
+    Returns:
+    --------
+        pd.DataFrame: the pull requests' columns, without msg_cntrb_id and
+            msg_timestamp, and their first response, in column first_response.
+    """
+    responses = df.loc[df["msg_cntrb_id"] != df["cntrb_id"], ["pull_request_id", "msg_timestamp"]]
+    first = responses.groupby("pull_request_id")["msg_timestamp"].min()
+
+    prs = df.drop_duplicates(subset="pull_request_id").drop(columns=["msg_cntrb_id", "msg_timestamp"])
+    prs["first_response"] = prs["pull_request_id"].map(first)
+
+    return prs.reset_index(drop=True)
+
+
+def open_responded_counts(prs, dates, num_days):
+    """
+    Counts the pull requests open at each date, and how many of them
+    had a first response within num_days of being opened.
+
+    A pull request counts as responded to at every date it is open at,
+    also those before its response, so both counts are open counts of
+    a set of pull requests.
+
+    Args:
+    -----
+        prs (pd.DataFrame): pull requests, from first_responses.
+        dates (pd.DatetimeIndex): dates to count at, ascending.
+        num_days (int): days after opening a response should be within.
+
+    Returns:
+    --------
+        (np.ndarray, np.ndarray): open and responded to pull requests per date.
+    """
+    response_by = prs["pr_created_at"] + pd.Timedelta(days=num_days)
+    responded = np.asarray(prs["first_response"] < response_by)
+
+    num_open = open_counts(prs["pr_created_at"], prs["pr_closed_at"], dates)
+    num_responded = open_counts(prs["pr_created_at"][responded], prs["pr_closed_at"][responded], dates)
+
+    return num_open, num_responded
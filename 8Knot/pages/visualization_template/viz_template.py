@@ -191,7 +191,7 @@ def NAME_OF_VISUALIZATION_graph(repolist, interval):
     cache = cm()
     df = cache.grabm(func=QUERY_INITIALS, repos=repolist)
     while df is None:
-        time.sleep(1.0)
+        cache.wait_ready(func=QUERY_INITIALS, repos=repolist)
         df = cache.grabm(func=QUERY_INITIALS, repos=repolist)
 
     start = time.perf_counter()
@@ -216,7 +216,8 @@ def process_data(df: pd.DataFrame, interval):
     The output of this function is the data you intend to create a visualization with,
     requiring no further processing."""
 
-    # convert to datetime objects rather than strings
+    # timestamp columns of queries declared in queries/schema_registry.py arrive as UTC datetimes,
+    # only convert those of queries that don't declare their results
     # ADD ANY OTHER COLUMNS WITH DATETIME
     df["COLUMN_WITH_DATETIME"] = pd.to_datetime(df["COLUMN_WITH_DATETIME"], utc=True)
 
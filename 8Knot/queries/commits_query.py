@@ -2,9 +2,9 @@ import logging
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 import pandas as pd
+import pyarrow as pa
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import partition_by_repo, to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 # DEBUGGING
@@ -12,6 +12,25 @@ import os
 
 QUERY_NAME = "COMMITS"
 
+# columns whose newest value is the watermark for incremental refreshes
+WATERMARK_COLUMNS = ["committer_timestamp"]
+
+# columns identifying a row when merging refreshed rows, None for the whole row
+KEY_COLUMNS = None
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "commits": pa.string(),
+    "author_email": pa.string(),
+    "date": pa.string(),
+    "author_timestamp": pa.timestamp("us", tz="UTC"),
+    "committer_timestamp": pa.timestamp("us", tz="UTC"),
+}
+
 
 @celery_app.task(
     bind=True,
@@ -20,7 +39,7 @@ QUERY_NAME = "COMMITS"
     retry_kwargs={"max_retries": 5},
     retry_jitter=True,
 )
-def commits_query(self, repos):
+def commits_query(self, repos, incremental=False):
     """
     (Worker Query)
     Executes SQL query against Augur database for commit data.
@@ -28,6 +47,8 @@ def commits_query(self, repos):
     Args:
     -----
         repo_ids ([str]): repos that SQL query is executed on.
+        incremental (bool): only query rows committed since the cached watermark
+            and merge them into the cached results.
 
     Returns:
     --------
@@ -41,6 +62,16 @@ def commits_query(self, repos):
     # commenting-outunused query components. only need the repo_id and the
     # authorship date for our current queries. remove the '--' to re-add
     # the now-removed values.
+    cm_o = cm()
+
+    # when refreshing, only rows that changed since the oldest watermark are read
+    since = cm_o.get_watermark(func=commits_query, repos=repos) if incremental else None
+    params = {"repo_ids": repos}
+    since_clause = ""
+    if since is not None:
+        params["since"] = since.isoformat()
+        since_clause = "AND c.cmt_committer_timestamp >= :since"
+
     query_string = f"""
                     SELECT
                         distinct
@@ -60,7 +91,8 @@ def commits_query(self, repos):
                     JOIN commits c
                         ON r.repo_id = c.repo_id
                     WHERE
-                        c.repo_id in ({str(repos)[1:-1]})
+                        c.repo_id = ANY(:repo_ids)
+                        {since_clause}
                     """
 
     try:
@@ -75,45 +107,45 @@ def commits_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params=params)
 
     # change to compatible type and remove all data that has been incorrectly formated
-    df["author_timestamp"] = pd.to_datetime(df["author_timestamp"], utc=True).dt.date
-    df = df[df.author_timestamp < dt.date.today()]
+    df["author_timestamp"] = to_day(df["author_timestamp"])
+    df = df[df.author_timestamp < pd.Timestamp.now(tz="UTC").floor("D")]
 
     # break apart returned data per repo
     # and temporarily store in List to be
     # stored in Redis.
-    pic = []
-    for r in repos:
-        # convert series to a dataframe
-        # once we've stored the data by ID we no longer need the column.
-        c_df = pd.DataFrame(df.loc[df["id"] == r].drop(columns=["id"])).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
-
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, marks = partition_by_repo(
+        cm_o,
+        func=commits_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+        watermark_columns=WATERMARK_COLUMNS,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
-    ack = cm_o.setm(
-        func=commits_query,
-        repos=repos,
-        datas=pic,
-    )
+    if since is None:
+        ack = cm_o.setm(
+            func=commits_query,
+            repos=repos,
+            datas=pic,
+        )
+    else:
+        # refreshed rows are merged into what's already cached
+        ack = cm_o.upsertm(
+            func=commits_query,
+            repos=repos,
+            datas=pic,
+            key_columns=KEY_COLUMNS,
+            compression=COMPRESSION,
+        )
+
+    cm_o.set_watermarks(func=commits_query, repos=repos, marks=marks, reset=since is None)
 
     logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
     return ack
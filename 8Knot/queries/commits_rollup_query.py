@@ -0,0 +1,103 @@
+import logging
+from db_manager.augur_manager import AugurManager
+from app import celery_app
+import pyarrow as pa
+from cache_manager.cache_manager import CacheManager as cm
+from queries.query_utils import partition_by_repo
+from sqlalchemy.exc import SQLAlchemyError
+
+QUERY_NAME = "COMMITS_ROLLUP"
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "day": pa.timestamp("us", tz="UTC"),
+    "commits": pa.int64(),
+}
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    exponential_backoff=2,
+    retry_kwargs={"max_retries": 5},
+    retry_jitter=True,
+)
+def commits_rollup_query(self, repos):
+    """
+    (Worker Query)
+    Executes SQL query against Augur database for the number of
+    distinct commits authored per day.
+
+    The counts are computed in the database, so graphs that only plot
+    commits per period read one row per repo and day instead of every commit.
+
+    Args:
+    -----
+        repo_ids ([str]): repos that SQL query is executed on.
+
+    Returns:
+    --------
+        dict: Results from SQL query, interpreted from pd.to_dict('records')
+    """
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - START")
+
+    if len(repos) == 0:
+        return None
+
+    # commits authored today are left out, like in commits_query. days are UTC days
+    # in the query itself, so they don't depend on the session's time zone
+    query_string = """
+                    SELECT
+                        c.repo_id AS id,
+                        date_trunc('day', c.cmt_author_timestamp AT TIME ZONE 'UTC') AS day,
+                        COUNT(DISTINCT c.cmt_commit_hash) AS commits
+                    FROM
+                        commits c
+                    WHERE
+                        c.repo_id = ANY(:repo_ids) AND
+                        c.cmt_author_timestamp AT TIME ZONE 'UTC' < (now() AT TIME ZONE 'UTC')::date
+                    GROUP BY
+                        c.repo_id,
+                        date_trunc('day', c.cmt_author_timestamp AT TIME ZONE 'UTC')
+                    """
+
+    try:
+        dbm = AugurManager()
+        engine = dbm.get_engine()
+    except KeyError:
+        # noack, data wasn't successfully set.
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - INCOMPLETE ENVIRONMENT")
+        return False
+    except SQLAlchemyError:
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - COULDN'T CONNECT TO DB")
+        # allow retry via Celery rules.
+        raise SQLAlchemyError("DBConnect failed")
+
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params={"repo_ids": repos})
+
+    cm_o = cm()
+
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=commits_rollup_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
+
+    del df
+
+    # store results in Redis
+    # 'ack' is a boolean of whether data was set correctly or not.
+    ack = cm_o.setm(
+        func=commits_rollup_query,
+        repos=repos,
+        datas=pic,
+    )
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
+
+    return ack
@@ -3,12 +3,42 @@ from db_manager.augur_manager import AugurManager
 from app import celery_app
 import pandas as pd
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import partition_by_repo, to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 QUERY_NAME = "COMPANY"
 
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "zstd"
+
+
+def process_data(df):
+    """
+    Reformats the company affiliation rows read from the database for caching.
+
+    Args:
+    -----
+        df (pd.DataFrame): rows of the query's result.
+
+    Returns:
+    --------
+        pd.DataFrame: rows as they are cached
+    """
+    # reformat cntrb_id
+    df["cntrb_id"] = df["cntrb_id"].astype(str)
+    df["cntrb_id"] = df["cntrb_id"].str[:15]
+
+    df = df.sort_values(by="created")
+
+    # change to compatible type and remove all data that has been incorrectly formatted
+    df["created"] = to_day(df["created"])
+    df = df[df.created < pd.Timestamp.now(tz="UTC").floor("D")]
+
+    df = df.reset_index()
+    df.drop("index", axis=1, inplace=True)
+
+    return df
+
 
 @celery_app.task(
     bind=True,
@@ -40,7 +70,9 @@ def company_query(self, repos):
     if len(repos) == 0:
         return None
 
-    query_string = f"""
+    cm_o = cm()
+
+    query_string = """
                     SELECT
                         c.cntrb_id,
                         c.created_at AS created,
@@ -57,7 +89,7 @@ def company_query(self, repos):
                     JOIN contributors con
                         ON c.cntrb_id = con.cntrb_id
                     WHERE
-                        c.repo_id in({str(repos)[1:-1]})
+                        c.repo_id = ANY(:repo_ids)
                     GROUP BY c.cntrb_id, c.created_at, c.repo_id, c.login, c.action, c.rank, con.cntrb_company
                     """
 
@@ -73,48 +105,23 @@ def company_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
-
-    # reformat cntrb_id
-    df["cntrb_id"] = df["cntrb_id"].astype(str)
-    df["cntrb_id"] = df["cntrb_id"].str[:15]
-
-    df = df.sort_values(by="created")
-
-    # change to compatible type and remove all data that has been incorrectly formatted
-    df["created"] = pd.to_datetime(df["created"], utc=True).dt.date
-    df = df[df.created < dt.date.today()]
-
-    df = df.reset_index()
-    df.drop("index", axis=1, inplace=True)
+    df = dbm.run_query(query_string, params={"repo_ids": repos})
+    df = process_data(df)
 
     # break apart returned data per repo
     # and temporarily store in List to be
     # stored in Redis.
-    pic = []
-    for r in repos:
-        # convert series to a dataframe
-        # once we've stored the data by ID we no longer need the column.
-        c_df = pd.DataFrame(df.loc[df["id"] == r].drop(columns=["id"])).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
-
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=company_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
     ack = cm_o.setm(
         func=company_query,
@@ -0,0 +1,155 @@
+import logging
+import pyarrow as pa
+from db_manager.augur_manager import AugurManager
+from app import celery_app
+from cache_manager.cache_manager import CacheManager as cm
+from queries import contributors_query as cnq
+from queries import company_query as cmq
+from sqlalchemy.exc import SQLAlchemyError
+
+QUERY_NAME = "CONTRIBUTOR_ACTIONS_SCAN"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "repo_name": pa.string(),
+    "cntrb_id": pa.string(),
+    "created_at": pa.timestamp("us", tz="UTC"),
+    "login": pa.string(),
+    "action": pa.string(),
+    "rank": pa.int64(),
+    "has_aliases": pa.bool_(),
+    "has_contributor": pa.bool_(),
+    "cntrb_company": pa.string(),
+    "email_list": pa.string(),
+}
+
+# columns of each query's cached results, in the order the query returns them
+CONTRIBUTORS_COLUMNS = ["id", "repo_name", "cntrb_id", "created_at", "login", "action", "rank"]
+COMPANY_COLUMNS = ["cntrb_id", "created", "login", "action", "rank", "cntrb_company", "email_list"]
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    exponential_backoff=2,
+    retry_kwargs={"max_retries": 5},
+    retry_jitter=True,
+    cached_queries=[cnq.contributors_query, cmq.company_query],
+)
+def contributor_actions_scan_query(self, repos):
+    """
+    (Worker Query)
+    Reads explorer_contributor_actions once for the results of
+    both contributors_query and company_query, and caches each
+    under its own query, exactly as the queries themselves would.
+
+    Contributor records and alias emails are left joined onto the
+    actions. Company results only keep the actions that have both,
+    like the inner joins of company_query.
+
+    Explorer_contributor_actions is a materialized view on the database for quicker run time and
+    may not be in your augur database. The SQL query content can be found
+    in docs/materialized_views/explorer_contributor_actions.sql
+
+    Args:
+    -----
+        repo_ids ([str]): repos that SQL query is executed on.
+
+    Returns:
+    --------
+        bool: whether the results of both queries were cached
+    """
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - START")
+
+    if len(repos) == 0:
+        return None
+
+    # the actions are read once and referenced twice, so Postgres materializes them
+    query_string = """
+                    WITH actions AS (
+                        SELECT
+                            repo_id,
+                            repo_name,
+                            cntrb_id,
+                            created_at,
+                            login,
+                            action,
+                            rank
+                        FROM
+                            augur_data.explorer_contributor_actions
+                        WHERE
+                            repo_id = ANY(:repo_ids)
+                    ),
+                    aliases AS (
+                        SELECT
+                            ca.cntrb_id,
+                            string_agg(ca.alias_email, ' , ' order by ca.alias_email) as email_list
+                        FROM
+                            contributors_aliases ca
+                        WHERE
+                            ca.cntrb_id in (SELECT DISTINCT cntrb_id FROM actions)
+                        GROUP BY ca.cntrb_id
+                    )
+                    SELECT
+                        a.repo_id as id,
+                        a.repo_name,
+                        a.cntrb_id,
+                        a.created_at,
+                        a.login,
+                        a.action,
+                        a.rank,
+                        al.cntrb_id IS NOT NULL AS has_aliases,
+                        con.cntrb_id IS NOT NULL AS has_contributor,
+                        con.cntrb_company,
+                        al.email_list
+                    FROM
+                        actions a
+                    LEFT JOIN aliases al
+                        ON a.cntrb_id = al.cntrb_id
+                    LEFT JOIN contributors con
+                        ON a.cntrb_id = con.cntrb_id
+                    ORDER BY
+                        a.repo_id
+                """
+
+    try:
+        dbm = AugurManager()
+        engine = dbm.get_engine()
+    except KeyError:
+        # noack, data wasn't successfully set.
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - INCOMPLETE ENVIRONMENT")
+        return False
+    except SQLAlchemyError:
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - COULDN'T CONNECT TO DB")
+        # allow retry via Celery rules.
+        raise SQLAlchemyError("DBConnect failed")
+
+    cm_o = cm()
+    acks = []
+
+    # rows arrive grouped by repo, each repo is processed and cached on its own
+    for r, df in dbm.stream_query_groups(
+        query_string, key="id", keys=repos, column_types=COLUMN_TYPES, params={"repo_ids": repos}
+    ):
+        # actions of contributors without aliases or contributor record aren't in company_query's result
+        affiliated = df["has_aliases"] & df["has_contributor"]
+        company_df = df.loc[affiliated].rename(columns={"created_at": "created"})[COMPANY_COLUMNS]
+        contributors_df = df[CONTRIBUTORS_COLUMNS]
+        del df
+
+        for func, query, q_df in (
+            (cnq.contributors_query, cnq, contributors_df),
+            (cmq.company_query, cmq, company_df),
+        ):
+            q_df = query.process_data(q_df.copy())
+
+            # write dataframe in feather format, compressed with the query's codec
+            pic = [cm_o.encode(func=func, df=q_df, compression=query.COMPRESSION)]
+
+            acks.append(cm_o.setm(func=func, repos=[r], datas=pic))
+
+    ack = all(acks)
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
+
+    return ack
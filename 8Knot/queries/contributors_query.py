@@ -1,14 +1,66 @@
 import logging
 import pandas as pd
+import pyarrow as pa
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 QUERY_NAME = "CONTRIBUTOR"
 
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "zstd"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "repo_name": pa.string(),
+    "cntrb_id": pa.string(),
+    "created_at": pa.timestamp("us", tz="UTC"),
+    "login": pa.string(),
+    "action": pa.string(),
+    "rank": pa.int64(),
+}
+
+
+def process_data(df):
+    """
+    Reformats the rows of one repo's contributor actions for caching.
+
+    Args:
+    -----
+        df (pd.DataFrame): rows read from explorer_contributor_actions.
+
+    Returns:
+    --------
+        pd.DataFrame: rows as they are cached
+    """
+    # update column values
+    df.loc[df["action"] == "pull_request_open", "action"] = "PR Opened"
+    df.loc[df["action"] == "pull_request_comment", "action"] = "PR Comment"
+    df.loc[df["action"] == "pull_request_closed", "action"] = "PR Closed"
+    df.loc[df["action"] == "pull_request_merged", "action"] = "PR Merged"
+    df.loc[df["action"] == "pull_request_review_COMMENTED", "action"] = "PR Review"
+    df.loc[df["action"] == "pull_request_review_APPROVED", "action"] = "PR Review"
+    df.loc[df["action"] == "pull_request_review_CHANGES_REQUESTED", "action"] = "PR Review"
+    df.loc[df["action"] == "pull_request_review_DISMISSED", "action"] = "PR Review"
+    df.loc[df["action"] == "issue_opened", "action"] = "Issue Opened"
+    df.loc[df["action"] == "issue_closed", "action"] = "Issue Closed"
+    df.loc[df["action"] == "issue_comment", "action"] = "Issue Comment"
+    df.loc[df["action"] == "commit", "action"] = "Commit"
+    df.rename(columns={"action": "Action"}, inplace=True)
+
+    # reformat cntrb_id
+    df["cntrb_id"] = df["cntrb_id"].astype(str)
+    df["cntrb_id"] = df["cntrb_id"].str[:15]
+
+    # change to compatible type and remove all data that has been incorrectly formated
+    df["created_at"] = to_day(df["created_at"])
+    df = df[df.created_at < pd.Timestamp.now(tz="UTC").floor("D")]
+
+    return df.reset_index(drop=True)
+
 
 @celery_app.task(
     bind=True,
@@ -26,6 +78,9 @@ def contributors_query(self, repos):
     may not be in your augur database. The SQL query content can be found
     in docs/materialized_views/explorer_contributor_actions.sql
 
+    Results are streamed in repo order and each repo is cached as soon
+    as its last row is read, so the whole result is never held in memory.
+
     Args:
     -----
         repo_ids ([str]): repos that SQL query is executed on.
@@ -40,7 +95,9 @@ def contributors_query(self, repos):
     if len(repos) == 0:
         return None
 
-    query_string = f"""
+    cm_o = cm()
+
+    query_string = """
                     SELECT
                         repo_id as id,
                         repo_name as repo_name,
@@ -52,7 +109,9 @@ def contributors_query(self, repos):
                     FROM
                         augur_data.explorer_contributor_actions
                     WHERE
-                        repo_id in ({str(repos)[1:-1]})
+                        repo_id = ANY(:repo_ids)
+                    ORDER BY
+                        repo_id
                 """
 
     try:
@@ -67,63 +126,28 @@ def contributors_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
-
-    # update column values
-    df.loc[df["action"] == "pull_request_open", "action"] = "PR Opened"
-    df.loc[df["action"] == "pull_request_comment", "action"] = "PR Comment"
-    df.loc[df["action"] == "pull_request_closed", "action"] = "PR Closed"
-    df.loc[df["action"] == "pull_request_merged", "action"] = "PR Merged"
-    df.loc[df["action"] == "pull_request_review_COMMENTED", "action"] = "PR Review"
-    df.loc[df["action"] == "pull_request_review_APPROVED", "action"] = "PR Review"
-    df.loc[df["action"] == "pull_request_review_CHANGES_REQUESTED", "action"] = "PR Review"
-    df.loc[df["action"] == "pull_request_review_DISMISSED", "action"] = "PR Review"
-    df.loc[df["action"] == "issue_opened", "action"] = "Issue Opened"
-    df.loc[df["action"] == "issue_closed", "action"] = "Issue Closed"
-    df.loc[df["action"] == "issue_comment", "action"] = "Issue Comment"
-    df.loc[df["action"] == "commit", "action"] = "Commit"
-    df.rename(columns={"action": "Action"}, inplace=True)
-
-    # reformat cntrb_id
-    df["cntrb_id"] = df["cntrb_id"].astype(str)
-    df["cntrb_id"] = df["cntrb_id"].str[:15]
-
-    # change to compatible type and remove all data that has been incorrectly formated
-    df["created_at"] = pd.to_datetime(df["created_at"], utc=True).dt.date
-    df = df[df.created_at < dt.date.today()]
-
-    df = df.reset_index(drop=True)
-
-    pic = []
-
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
+    acks = []
 
-        # bytes buffer to be written to
-        b = io.BytesIO()
+    # rows arrive grouped by repo, each repo is processed and cached on its own
+    for r, df in dbm.stream_query_groups(
+        query_string, key="id", keys=repos, column_types=COLUMN_TYPES, params={"repo_ids": repos}
+    ):
+        c_df = process_data(df)
+        del df
 
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
+        # write dataframe in feather format, compressed with the query's codec
+        pic = [cm_o.encode(func=contributors_query, df=c_df, compression=COMPRESSION)]
 
-        # move head of buffer to the beginning
-        b.seek(0)
-
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
-
-    del df
-
-    # store results in Redis
-    cm_o = cm()
+        # store results in Redis
+        # 'ack' is a boolean of whether data was set correctly or not.
+        ack = cm_o.setm(
+            func=contributors_query,
+            repos=[r],
+            datas=pic,
+        )
+        acks.append(ack)
 
-    # 'ack' is a boolean of whether data was set correctly or not.
-    ack = cm_o.setm(
-        func=contributors_query,
-        repos=repos,
-        datas=pic,
-    )
+    ack = all(acks)
     logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
 
     return ack
@@ -0,0 +1,113 @@
+import logging
+from db_manager.augur_manager import AugurManager
+from app import celery_app
+import pyarrow as pa
+from cache_manager.cache_manager import CacheManager as cm
+from queries.query_utils import partition_by_repo
+from sqlalchemy.exc import SQLAlchemyError
+
+QUERY_NAME = "CONTRIBUTORS_ROLLUP"
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "zstd"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "cntrb_id": pa.string(),
+    "day": pa.timestamp("us", tz="UTC"),
+    "latest": pa.bool_(),
+}
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    exponential_backoff=2,
+    retry_kwargs={"max_retries": 5},
+    retry_jitter=True,
+)
+def contributors_rollup_query(self, repos):
+    """
+    (Worker Query)
+    Executes SQL query against Augur database for the days
+    each contributor was active on.
+
+    Distinct contributor counts don't add up across days or repos,
+    so the rows are kept per (repo, contributor, day) rather than
+    counted, which is still far fewer than one row per action.
+    'latest' marks the day of a contributor's latest action in the repo,
+    the rank-1 row of contributors_query.
+
+    Explorer_contributor_actions is a materialized view on the database for quicker run time and
+    may not be in your augur database. The SQL query content can be found
+    in docs/materialized_views/explorer_contributor_actions.sql
+
+    Args:
+    -----
+        repo_ids ([str]): repos that SQL query is executed on.
+
+    Returns:
+    --------
+        dict: Results from SQL query, interpreted from pd.to_dict('records')
+    """
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - START")
+
+    if len(repos) == 0:
+        return None
+
+    # ids are shortened and actions from today left out, like in contributors_query.
+    # days are UTC days in the query itself, so they don't depend on the session's time zone
+    query_string = """
+                    SELECT
+                        repo_id AS id,
+                        left(cntrb_id::text, 15) AS cntrb_id,
+                        date_trunc('day', created_at AT TIME ZONE 'UTC') AS day,
+                        bool_or(rank = 1) AS latest
+                    FROM
+                        augur_data.explorer_contributor_actions
+                    WHERE
+                        repo_id = ANY(:repo_ids) AND
+                        created_at AT TIME ZONE 'UTC' < (now() AT TIME ZONE 'UTC')::date
+                    GROUP BY
+                        repo_id,
+                        left(cntrb_id::text, 15),
+                        date_trunc('day', created_at AT TIME ZONE 'UTC')
+                """
+
+    try:
+        dbm = AugurManager()
+        engine = dbm.get_engine()
+    except KeyError:
+        # noack, data wasn't successfully set.
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - INCOMPLETE ENVIRONMENT")
+        return False
+    except SQLAlchemyError:
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - COULDN'T CONNECT TO DB")
+        # allow retry via Celery rules.
+        raise SQLAlchemyError("DBConnect failed")
+
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params={"repo_ids": repos})
+
+    cm_o = cm()
+
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=contributors_rollup_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
+
+    del df
+
+    # store results in Redis
+    # 'ack' is a boolean of whether data was set correctly or not.
+    ack = cm_o.setm(
+        func=contributors_rollup_query,
+        repos=repos,
+        datas=pic,
+    )
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
+
+    return ack
@@ -3,12 +3,14 @@ import pandas as pd
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import partition_by_repo, to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 QUERY_NAME = "ISSUE_ASSIGNEE"
 
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
 
 @celery_app.task(
     bind=True,
@@ -38,13 +40,13 @@ def issue_assignee_query(self, repos):
     if len(repos) == 0:
         return None
 
-    query_string = f"""
+    query_string = """
                     SELECT
                         *
                     FROM
                         explorer_issue_assignments ia
                     WHERE
-                        ia.id in ({str(repos)[1:-1]})
+                        ia.id = ANY(:repo_ids)
                 """
 
     try:
@@ -59,40 +61,29 @@ def issue_assignee_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
+    df = dbm.run_query(query_string, params={"repo_ids": repos})
 
     # id as string and slice to remove excess 0s
     df["assignee"] = df["assignee"].astype(str)
     df["assignee"] = df["assignee"].str[:15]
 
     # change to compatible type and remove all data that has been incorrectly formated
-    df["created"] = pd.to_datetime(df["created"], utc=True).dt.date
-    df = df[df.created < dt.date.today()]
-
-    pic = []
-
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
+    df["created"] = to_day(df["created"])
+    df = df[df.created < pd.Timestamp.now(tz="UTC").floor("D")]
 
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
+    cm_o = cm()
 
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=issue_assignee_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
     ack = cm_o.setm(
         func=issue_assignee_query,
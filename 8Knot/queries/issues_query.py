@@ -2,13 +2,21 @@ import logging
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
+from queries.query_utils import partition_by_repo, to_day
 import pandas as pd
-import io
-import datetime as dt
 from sqlalchemy.exc import SQLAlchemyError
 
 QUERY_NAME = "ISSUE"
 
+# columns whose newest value is the watermark for incremental refreshes
+WATERMARK_COLUMNS = ["created", "closed"]
+
+# columns identifying a row when merging refreshed rows, None for the whole row
+KEY_COLUMNS = ["issue"]
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
 
 @celery_app.task(
     bind=True,
@@ -17,7 +25,7 @@ QUERY_NAME = "ISSUE"
     retry_kwargs={"max_retries": 5},
     retry_jitter=True,
 )
-def issues_query(self, repos):
+def issues_query(self, repos, incremental=False):
     """
     (Worker Query)
     Executes SQL query against Augur database for issue data.
@@ -25,6 +33,8 @@ def issues_query(self, repos):
     Args:
     -----
         repo_ids ([str]): repos that SQL query is executed on.
+        incremental (bool): only query rows created or closed since the cached watermark
+            and merge them into the cached results.
 
     Returns:
     --------
@@ -36,6 +46,19 @@ def issues_query(self, repos):
     if len(repos) == 0:
         return None
 
+    cm_o = cm()
+
+    # when refreshing, only rows that changed since the oldest watermark are read
+    since = cm_o.get_watermark(func=issues_query, repos=repos) if incremental else None
+    params = {"repo_ids": repos}
+    since_clause = ""
+    if since is not None:
+        params["since"] = since.isoformat()
+        since_clause = """AND (
+                            i.created_at >= :since OR
+                            i.closed_at >= :since
+                        )"""
+
     query_string = f"""
                     SELECT
                         r.repo_id as id,
@@ -51,7 +74,8 @@ def issues_query(self, repos):
                         issues i
                     WHERE
                         r.repo_id = i.repo_id AND
-                        r.repo_id in ({str(repos)[1:-1]})
+                        r.repo_id = ANY(:repo_ids)
+                        {since_clause}
                     """
 
     try:
@@ -66,15 +90,15 @@ def issues_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
+    df = dbm.run_query(query_string, params=params)
 
     df = df[df["pull_request_id"].isnull()]
     df = df.drop(columns="pull_request_id")
     df = df.sort_values(by="created")
 
     # change to compatible type and remove all data that has been incorrectly formated
-    df["created"] = pd.to_datetime(df["created"], utc=True).dt.date
-    df = df[df.created < dt.date.today()]
+    df["created"] = to_day(df["created"])
+    df = df[df.created < pd.Timestamp.now(tz="UTC").floor("D")]
 
     df = df.reset_index()
     df.drop("index", axis=1, inplace=True)
@@ -82,35 +106,36 @@ def issues_query(self, repos):
     # break apart returned data per repo
     # and temporarily store in List to be
     # stored in Redis.
-    pic = []
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
-
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, marks = partition_by_repo(
+        cm_o,
+        func=issues_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+        watermark_columns=WATERMARK_COLUMNS,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
-    ack = cm_o.setm(
-        func=issues_query,
-        repos=repos,
-        datas=pic,
-    )
+    if since is None:
+        ack = cm_o.setm(
+            func=issues_query,
+            repos=repos,
+            datas=pic,
+        )
+    else:
+        # refreshed rows are merged into what's already cached
+        ack = cm_o.upsertm(
+            func=issues_query,
+            repos=repos,
+            datas=pic,
+            key_columns=KEY_COLUMNS,
+            compression=COMPRESSION,
+        )
+
+    cm_o.set_watermarks(func=issues_query, repos=repos, marks=marks, reset=since is None)
 
     logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
     return ack
@@ -0,0 +1,105 @@
+import logging
+from db_manager.augur_manager import AugurManager
+from app import celery_app
+import pyarrow as pa
+from cache_manager.cache_manager import CacheManager as cm
+from queries.query_utils import partition_by_repo
+from sqlalchemy.exc import SQLAlchemyError
+
+QUERY_NAME = "ISSUES_ROLLUP"
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "id": pa.int64(),
+    "day": pa.timestamp("us", tz="UTC"),
+    "closed": pa.int64(),
+}
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    exponential_backoff=2,
+    retry_kwargs={"max_retries": 5},
+    retry_jitter=True,
+)
+def issues_rollup_query(self, repos):
+    """
+    (Worker Query)
+    Executes SQL query against Augur database for the number of
+    issues closed per day.
+
+    The counts are computed in the database, so graphs that only plot
+    issues per period read one row per repo and day instead of every issue.
+
+    Args:
+    -----
+        repo_ids ([str]): repos that SQL query is executed on.
+
+    Returns:
+    --------
+        dict: Results from SQL query, interpreted from pd.to_dict('records')
+    """
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - START")
+
+    if len(repos) == 0:
+        return None
+
+    # pull requests and issues created today are left out, like in issues_query.
+    # closed_at is a timestamp without time zone, in UTC, so only today is taken in UTC
+    query_string = """
+                    SELECT
+                        i.repo_id AS id,
+                        date_trunc('day', i.closed_at) AS day,
+                        COUNT(*) AS closed
+                    FROM
+                        issues i
+                    WHERE
+                        i.repo_id = ANY(:repo_ids) AND
+                        i.pull_request_id IS NULL AND
+                        i.closed_at IS NOT NULL AND
+                        i.created_at < (now() AT TIME ZONE 'UTC')::date
+                    GROUP BY
+                        i.repo_id,
+                        date_trunc('day', i.closed_at)
+                    """
+
+    try:
+        dbm = AugurManager()
+        engine = dbm.get_engine()
+    except KeyError:
+        # noack, data wasn't successfully set.
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - INCOMPLETE ENVIRONMENT")
+        return False
+    except SQLAlchemyError:
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - COULDN'T CONNECT TO DB")
+        # allow retry via Celery rules.
+        raise SQLAlchemyError("DBConnect failed")
+
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params={"repo_ids": repos})
+
+    cm_o = cm()
+
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=issues_rollup_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
+
+    del df
+
+    # store results in Redis
+    # 'ack' is a boolean of whether data was set correctly or not.
+    ack = cm_o.setm(
+        func=issues_rollup_query,
+        repos=repos,
+        datas=pic,
+    )
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
+
+    return ack
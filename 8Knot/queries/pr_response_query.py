@@ -1,14 +1,54 @@
 import logging
 import pandas as pd
+import pyarrow as pa
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import partition_by_repo, to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 QUERY_NAME = "PR_RESPONSE"
 
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "pull_request_id": pa.int64(),
+    "id": pa.int64(),
+    "cntrb_id": pa.string(),
+    "msg_timestamp": pa.timestamp("us"),
+    "msg_cntrb_id": pa.string(),
+    "pr_created_at": pa.timestamp("us"),
+    "pr_closed_at": pa.timestamp("us"),
+}
+
+
+def process_data(df):
+    """
+    Reformats the pull request message rows read from the database for caching.
+
+    Args:
+    -----
+        df (pd.DataFrame): rows of the query's result.
+
+    Returns:
+    --------
+        pd.DataFrame: rows as they are cached
+    """
+    # reformat cntrb_id
+    df["cntrb_id"] = df["cntrb_id"].astype(str)
+    df["cntrb_id"] = df["cntrb_id"].str[:15]
+
+    df["msg_cntrb_id"] = df["msg_cntrb_id"].astype(str)
+    df["msg_cntrb_id"] = df["msg_cntrb_id"].str[:15]
+
+    # change to compatible type and remove all data that has been incorrectly formated
+    df["pr_created_at"] = to_day(df["pr_created_at"])
+    df = df[df.pr_created_at < pd.Timestamp.now(tz="UTC").floor("D")]
+
+    return df
+
 
 @celery_app.task(
     bind=True,
@@ -39,7 +79,7 @@ def pr_response_query(self, repos):
     if len(repos) == 0:
         return None
 
-    query_string = f"""
+    query_string = """
                     SELECT
                         pr.pull_request_id,
                         pr.repo_id AS ID,
@@ -81,7 +121,7 @@ def pr_response_query(self, repos):
                         ON
                             M.pull_request_id = pr.pull_request_id
                     WHERE
-                        pr.repo_id in ({str(repos)[1:-1]})
+                        pr.repo_id = ANY(:repo_ids)
                 """
 
     try:
@@ -96,43 +136,22 @@ def pr_response_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
-
-    # reformat cntrb_id
-    df["cntrb_id"] = df["cntrb_id"].astype(str)
-    df["cntrb_id"] = df["cntrb_id"].str[:15]
-
-    df["msg_cntrb_id"] = df["msg_cntrb_id"].astype(str)
-    df["msg_cntrb_id"] = df["msg_cntrb_id"].str[:15]
-
-    # change to compatible type and remove all data that has been incorrectly formated
-    df["pr_created_at"] = pd.to_datetime(df["pr_created_at"], utc=True).dt.date
-    df = df[df.pr_created_at < dt.date.today()]
-
-    pic = []
-
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params={"repo_ids": repos})
+    df = process_data(df)
 
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
+    cm_o = cm()
 
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=pr_response_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
     ack = cm_o.setm(
         func=pr_response_query,
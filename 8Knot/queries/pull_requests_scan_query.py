@@ -0,0 +1,182 @@
+import logging
+import pyarrow as pa
+from db_manager.augur_manager import AugurManager
+from app import celery_app
+from cache_manager.cache_manager import CacheManager as cm
+from queries.query_utils import partition_by_repo
+from queries import prs_query as prq
+from queries import pr_response_query as prr
+from sqlalchemy.exc import SQLAlchemyError
+
+QUERY_NAME = "PULL_REQUESTS_SCAN"
+
+# Arrow types of the result columns, lets the worker read the result with COPY
+COLUMN_TYPES = {
+    "pull_request_id": pa.int64(),
+    "id": pa.int64(),
+    "repo_name": pa.string(),
+    "pr_src_number": pa.int64(),
+    "cntrb_id": pa.string(),
+    "msg_timestamp": pa.timestamp("us"),
+    "msg_cntrb_id": pa.string(),
+    "pr_created_at": pa.timestamp("us"),
+    "pr_closed_at": pa.timestamp("us"),
+    "pr_merged_at": pa.timestamp("us"),
+}
+
+# columns of prs_query's cached results by the scan's column they come from
+PRS_COLUMNS = {
+    "id": "id",
+    "repo_name": "repo_name",
+    "pull_request_id": "pull_request",
+    "pr_src_number": "pr_src_number",
+    "pr_created_at": "created",
+    "pr_closed_at": "closed",
+    "pr_merged_at": "merged",
+}
+
+# columns of pr_response_query's cached results
+PR_RESPONSE_COLUMNS = list(prr.COLUMN_TYPES)
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    exponential_backoff=2,
+    retry_kwargs={"max_retries": 5},
+    retry_jitter=True,
+    cached_queries=[prq.prs_query, prr.pr_response_query],
+)
+def pull_requests_scan_query(self, repos):
+    """
+    (Worker Query)
+    Reads pull_requests once for the results of both prs_query
+    and pr_response_query, and caches each under its own query,
+    exactly as the queries themselves would.
+
+    The scan has a row per message in response to a pull request,
+    or one row for pull requests without any, like pr_response_query.
+    The pull requests of prs_query are its distinct pull requests.
+
+    Args:
+    -----
+        repo_ids ([str]): repos that SQL query is executed on.
+
+    Returns:
+    --------
+        bool: whether the results of both queries were cached
+    """
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - START")
+
+    if len(repos) == 0:
+        return None
+
+    # messages only need to reference a pull request, the outer join
+    # already restricts them to the selected repos' pull requests
+    query_string = """
+                    SELECT
+                        pr.pull_request_id,
+                        pr.repo_id AS id,
+                        r.repo_name,
+                        pr.pr_src_number,
+                        pr.pr_augur_contributor_id AS cntrb_id,
+                        M.msg_timestamp,
+                        M.msg_cntrb_id,
+                        pr.pr_created_at,
+                        pr.pr_closed_at,
+                        pr.pr_merged_at
+                    FROM
+                        repo r
+                    JOIN pull_requests pr
+                        ON r.repo_id = pr.repo_id
+                    LEFT OUTER JOIN
+                        (
+                            SELECT
+                                prr.pull_request_id AS pull_request_id,
+                                m.msg_timestamp AS msg_timestamp,
+                                m.cntrb_id AS msg_cntrb_id
+                            FROM
+                                pull_request_review_message_ref prrmr,
+                                message m,
+                                pull_request_reviews prr
+                            WHERE
+                                prrmr.pr_review_id = prr.pr_review_id AND
+                                prrmr.msg_id = m.msg_id
+                            UNION ALL
+                            SELECT
+                                prmr.pull_request_id AS pull_request_id,
+                                m.msg_timestamp AS msg_timestamp,
+                                m.cntrb_id AS msg_cntrb_id
+                            FROM
+                                pull_request_message_ref prmr,
+                                message m
+                            WHERE
+                                prmr.msg_id = m.msg_id
+                        ) M
+                        ON
+                            M.pull_request_id = pr.pull_request_id
+                    WHERE
+                        pr.repo_id = ANY(:repo_ids)
+                """
+
+    try:
+        dbm = AugurManager()
+        engine = dbm.get_engine()
+    except KeyError:
+        # noack, data wasn't successfully set.
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - INCOMPLETE ENVIRONMENT")
+        return False
+    except SQLAlchemyError:
+        logging.error(f"{QUERY_NAME}_DATA_QUERY - COULDN'T CONNECT TO DB")
+        # allow retry via Celery rules.
+        raise SQLAlchemyError("DBConnect failed")
+
+    df = dbm.run_query(query_string, column_types=COLUMN_TYPES, params={"repo_ids": repos})
+
+    prs_df = df[list(PRS_COLUMNS)].drop_duplicates(subset="pull_request_id").rename(columns=PRS_COLUMNS)
+    prs_df = prq.process_data(prs_df)
+
+    response_df = prr.process_data(df[PR_RESPONSE_COLUMNS])
+    del df
+
+    cm_o = cm()
+
+    pic, marks = partition_by_repo(
+        cm_o,
+        func=prq.prs_query,
+        df=prs_df,
+        repos=repos,
+        compression=prq.COMPRESSION,
+        watermark_columns=prq.WATERMARK_COLUMNS,
+    )
+    del prs_df
+
+    # store results in Redis
+    # 'ack' is a boolean of whether data was set correctly or not.
+    ack = cm_o.setm(
+        func=prq.prs_query,
+        repos=repos,
+        datas=pic,
+    )
+    cm_o.set_watermarks(func=prq.prs_query, repos=repos, marks=marks, reset=True)
+
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=prr.pr_response_query,
+        df=response_df,
+        repos=repos,
+        compression=prr.COMPRESSION,
+    )
+    del response_df
+
+    ack = (
+        cm_o.setm(
+            func=prr.pr_response_query,
+            repos=repos,
+            datas=pic,
+        )
+        and ack
+    )
+
+    logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
+    return ack
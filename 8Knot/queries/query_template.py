@@ -3,7 +3,7 @@ import pandas as pd
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
-import io
+from queries.query_utils import partition_by_repo
 import datetime as dt
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -16,11 +16,15 @@ TODO:
 (4) insert any necessary df column name or format changed under the pandas column and format updates comment
 (5) reset df index if #4 is performed via "df = df.reset_index(drop=True)"
 (6) go to index/index_callbacks.py and import the NAME_query as a unqiue acronym and add it to the QUERIES list
-(7) delete this list when completed
+(7) declare the cached columns, their types and sort order in queries/schema_registry.py
+(8) delete this list when completed
 """
 
 QUERY_NAME = "NAME"
 
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
 
 @celery_app.task(
     bind=True,
@@ -47,13 +51,13 @@ def NAME_query(self, repos):
     if len(repos) == 0:
         return None
 
-    query_string = f"""
+    query_string = """
                     SELECT
 
                     FROM
 
                     WHERE
-                        repo_id in ({str(repos)[1:-1]})
+                        repo_id = ANY(:repo_ids)
                 """
 
     try:
@@ -68,7 +72,7 @@ def NAME_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
+    df = dbm.run_query(query_string, params={"repo_ids": repos})
 
     # pandas column and format updates
     """Commonly used df updates:
@@ -84,30 +88,19 @@ def NAME_query(self, repos):
     df["created"] = pd.to_datetime(df["created"], utc=True).dt.date
     df = df[df.created < dt.date.today()]
 
-    pic = []
-
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
-
-        # move head of buffer to the beginning
-        b.seek(0)
+    cm_o = cm()
 
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    pic, _ = partition_by_repo(
+        cm_o,
+        func=NAME_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
     ack = cm_o.setm(
         func=NAME_query,
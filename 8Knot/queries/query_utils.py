@@ -0,0 +1,136 @@
+import os
+import heapq
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from queries.schema_registry import get_query_schema
+
+# partitions serialized at once per query task, Arrow releases the GIL while compressing.
+SERIALIZE_THREADS = int(os.getenv("QUERY_SERIALIZE_THREADS", 1))
+
+
+def to_day(values):
+    """
+    Truncates timestamps to the start of their day in UTC, for
+    columns that are only used by the day.
+
+    Args:
+    -----
+        values (pd.Series): timestamps, naive ones are taken to be UTC.
+
+    Returns:
+    --------
+        pd.Series: datetime64 values at midnight UTC
+    """
+    return pd.to_datetime(values, utc=True).dt.floor("D")
+
+
+def _newest(table, columns):
+    """
+    (private)
+    Newest value across 'columns' of table, as a UTC timestamp.
+
+    Args:
+    -----
+        table (pa.Table): rows of one repo.
+        columns (list[str]): date or timestamp columns.
+
+    Returns:
+    --------
+        pd.Timestamp: newest value, NaT if there's none.
+    """
+    values = [pc.max(table[c]).as_py() for c in columns if not pa.types.is_null(table[c].type)]
+    values = [v for v in values if v is not None]
+    if not values:
+        return pd.NaT
+
+    return pd.to_datetime(pd.Series(values), utc=True).max()
+
+
+def partition_by_repo(cm_o, func, df, repos, compression=None, drop_key=False, watermark_columns=None, key=None):
+    """
+    Splits a query's result into one feather-format value per repo
+    in a single pass, for CacheManager.setm.
+
+    The result is converted to Arrow once and sorted by repo, after
+    which each repo's rows are a contiguous slice found by binary search.
+    Slices are zero-copy, so the cost no longer grows with
+    repos x rows like filtering the result once per repo did.
+
+    Args:
+    -----
+        cm_o (CacheManager): cache the values will be written to.
+        func (function): Query function used
+        df (pd.DataFrame): the query's result for all repos.
+        repos (list[int]): repo_ids to create values for, in order.
+            Repos without rows get an empty value.
+        compression (str | None): query's choice of codec, see CacheManager.encode.
+        drop_key (bool): leave the repo column out of the values. Queries with
+            a declared schema keep it if and only if the schema declares it.
+        watermark_columns (list[str] | None): columns to take each repo's watermark from.
+        key (str | None): column holding the repo_id, by default the declared
+            partition key or 'id'.
+
+    Returns:
+    --------
+        (list[bytes], list[pd.Timestamp] | None): value per repo, and
+            newest watermark column value per repo if watermark_columns is given.
+    """
+    if key is None:
+        query_schema = get_query_schema(func)
+        key = query_schema.partition_key if query_schema is not None else "id"
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # sort once, each repo's rows are then contiguous
+    table = table.take(pc.sort_indices(table, sort_keys=[(key, "ascending")]))
+    ids = table[key].to_numpy()
+
+    starts = np.searchsorted(ids, repos, side="left")
+    ends = np.searchsorted(ids, repos, side="right")
+
+    if drop_key:
+        table = table.drop([key])
+
+    partitions = [table.slice(s, e - s) for s, e in zip(starts, ends)]
+
+    datas = cm_o.encodem(func=func, dfs=partitions, compression=compression, threads=SERIALIZE_THREADS)
+
+    marks = None
+    if watermark_columns is not None:
+        marks = [_newest(p, watermark_columns) for p in partitions]
+
+    return datas, marks
+
+
+def chunk_by_cost(repos, costs, num_chunks):
+    """
+    Splits repos into chunks of about equal total cost, so that
+    parallel query tasks finish at about the same time.
+
+    Repos are assigned most expensive first, each to the chunk
+    with the lowest total so far.
+
+    Args:
+    -----
+        repos (list[int]): repo_ids to split.
+        costs (list[float]): estimated cost per repo, see CacheManager.repo_costs.
+        num_chunks (int): number of chunks to create.
+
+    Returns:
+    --------
+        list[list[int]]: non-empty chunks of repos
+    """
+    num_chunks = max(1, min(num_chunks, len(repos)))
+
+    # (total cost, chunk index) of every chunk, cheapest on top
+    totals = [(0.0, i) for i in range(num_chunks)]
+    chunks = [[] for _ in range(num_chunks)]
+
+    for cost, r in sorted(zip(costs, repos), key=lambda cr: cr[0], reverse=True):
+        total, i = heapq.heappop(totals)
+        chunks[i].append(r)
+        heapq.heappush(totals, (total + cost, i))
+
+    return [c for c in chunks if c]
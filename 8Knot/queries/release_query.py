@@ -3,8 +3,7 @@ import pandas as pd
 from db_manager.augur_manager import AugurManager
 from app import celery_app
 from cache_manager.cache_manager import CacheManager as cm
-import io
-import datetime as dt
+from queries.query_utils import partition_by_repo, to_day
 from sqlalchemy.exc import SQLAlchemyError
 
 """
@@ -21,6 +20,15 @@ TODO:
 
 QUERY_NAME = "RELEASE"
 
+# columns whose newest value is the watermark for incremental refreshes
+WATERMARK_COLUMNS = ["releasedate"]
+
+# columns identifying a row when merging refreshed rows, None for the whole row
+KEY_COLUMNS = None
+
+# codec cached results are compressed with, 'lz4', 'zstd' or 'uncompressed' with an optional ':level'
+COMPRESSION = "lz4"
+
 
 @celery_app.task(
     bind=True,
@@ -29,7 +37,7 @@ QUERY_NAME = "RELEASE"
     retry_kwargs={"max_retries": 5},
     retry_jitter=True,
 )
-def release_query(self, repos):
+def release_query(self, repos, incremental=False):
     """
     (Worker Query)
     Executes SQL query against Augur database for contributor data.
@@ -37,6 +45,8 @@ def release_query(self, repos):
     Args:
     -----
         repo_ids ([str]): repos that SQL query is executed on.
+        incremental (bool): only query rows published since the cached watermark
+            and merge them into the cached results.
 
     Returns:
     --------
@@ -47,12 +57,23 @@ def release_query(self, repos):
     if len(repos) == 0:
         return None
 
+    cm_o = cm()
+
+    # when refreshing, only rows that changed since the oldest watermark are read
+    since = cm_o.get_watermark(func=release_query, repos=repos) if incremental else None
+    params = {"repo_ids": repos}
+    since_clause = ""
+    if since is not None:
+        params["since"] = since.isoformat()
+        since_clause = "AND re.release_published_at >= :since"
+
     query_string = f"""
                     select r.repo_id as id, r.repo_name, r.repo_git, re.release_published_at as releasedate
                     from repo r, releases re 
                     where r.repo_id = re.repo_id 
                     and release_published_at is not NULL
-                    and r.repo_id in ({str(repos)[1:-1]})
+                    and r.repo_id = ANY(:repo_ids)
+                    {since_clause}
                     order by release_published_at
                 """
 
@@ -68,7 +89,7 @@ def release_query(self, repos):
         # allow retry via Celery rules.
         raise SQLAlchemyError("DBConnect failed")
 
-    df = dbm.run_query(query_string)
+    df = dbm.run_query(query_string, params=params)
     logging.warning(f"{df}")
     # pandas column and format updates
     """Commonly used df updates:
@@ -81,42 +102,41 @@ def release_query(self, repos):
 
     """
     # change to compatible type and remove all data that has been incorrectly formated
-    df["releasedate"] = pd.to_datetime(df["releasedate"], utc=True).dt.date
-    df = df[df.releasedate < dt.date.today()]
-
-    df = df.sort_values(by="releasedate")
-    df = df.reset_index()
-    df.drop("index", axis=1, inplace=True)
-    pic = []
-
-    for i, r in enumerate(repos):
-        # convert series to a dataframe
-        c_df = pd.DataFrame(df.loc[df["id"] == r]).reset_index(drop=True)
-
-        # bytes buffer to be written to
-        b = io.BytesIO()
-
-        # write dataframe in feather format to BytesIO buffer
-        bs = c_df.to_feather(b)
+    df["releasedate"] = to_day(df["releasedate"])
+    df = df[df.releasedate < pd.Timestamp.now(tz="UTC").floor("D")]
 
-        # move head of buffer to the beginning
-        b.seek(0)
-
-        # write the bytes of the buffer into the array
-        bs = b.read()
-        pic.append(bs)
+    # rows are cached sorted by release date, see queries.schema_registry
+    df = df.reset_index(drop=True)
+    pic, marks = partition_by_repo(
+        cm_o,
+        func=release_query,
+        df=df,
+        repos=repos,
+        compression=COMPRESSION,
+        watermark_columns=WATERMARK_COLUMNS,
+    )
 
     del df
 
     # store results in Redis
-    cm_o = cm()
-
     # 'ack' is a boolean of whether data was set correctly or not.
-    ack = cm_o.setm(
-        func=release_query,
-        repos=repos,
-        datas=pic,
-    )
+    if since is None:
+        ack = cm_o.setm(
+            func=release_query,
+            repos=repos,
+            datas=pic,
+        )
+    else:
+        # refreshed rows are merged into what's already cached
+        ack = cm_o.upsertm(
+            func=release_query,
+            repos=repos,
+            datas=pic,
+            key_columns=KEY_COLUMNS,
+            compression=COMPRESSION,
+        )
+
+    cm_o.set_watermarks(func=release_query, repos=repos, marks=marks, reset=since is None)
     logging.warning(f"{QUERY_NAME}_DATA_QUERY - END")
 
     return ack
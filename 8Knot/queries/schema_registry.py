@@ -0,0 +1,311 @@
+"""
+Declares the results every query caches: the Arrow schema of the
+cached columns, the order of a repo's rows, and the column the results
+are partitioned into one cache value per repo by.
+
+Query tasks are checked against their declaration when their results
+are written (CacheManager.encode), and CacheManager reads cached values
+back with the declared types, so callbacks get UTC datetime columns
+and don't have to coerce them.
+
+The declaration's fingerprint is part of the query's cache keys. Changing
+a query's schema, sort order or partition key makes it miss the values
+written under the old declaration and query them again.
+
+This module only depends on pyarrow so that CacheManager can use it
+without importing the query tasks.
+"""
+import hashlib
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# types of cached columns: timestamps in UTC, and strings that repeat
+# within a repo's rows (actions, names, contributor ids) stored once per value.
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+
+class SchemaError(ValueError):
+    """A query's results don't match its declared schema."""
+
+
+class QuerySchema:
+    """
+    Declared results of one query.
+
+    Attributes:
+    -----------
+        name : name of the query function
+        schema : pa.Schema of the cached columns, in order
+        sort_by : columns a repo's rows are stored sorted by, ascending
+        partition_key : column holding the repo_id the results are cached by.
+            Left out of the cached values if the schema doesn't declare it.
+        fingerprint : short hash of the declaration, part of the query's cache keys
+
+    Methods:
+    --------
+        conform(table, columns):
+            Checks the table against the schema and casts it to the declared types.
+    """
+
+    def __init__(self, name, schema, sort_by=(), partition_key="id"):
+        self.name = name
+        self.schema = schema
+        self.sort_by = list(sort_by)
+        self.partition_key = partition_key
+
+        declaration = f"{schema.remove_metadata().to_string()}|{self.sort_by}|{partition_key}"
+        self.fingerprint = hashlib.md5(declaration.encode("utf-8")).hexdigest()[:8]
+
+    def conform(self, table, columns=None):
+        """
+        Checks that 'table' has the declared columns and casts them
+        to the declared types, in the declared order. Columns the schema
+        doesn't declare are left out. Tables of all declared columns, i.e.
+        results being written, are also sorted by 'sort_by'.
+
+        Dictionary types are built by encoding the column, Arrow can't cast
+        strings to them. Columns pandas couldn't type, because they are empty
+        or only hold nulls, become empty or null columns of the declared type.
+
+        Args:
+        -----
+            table (pa.Table): results of the query for one repo.
+            columns (list[str] | None): only conform these columns, e.g.
+                of a table read with a subset of them. All declared if None.
+
+        Returns:
+        --------
+            pa.Table: data with the declared types
+
+        Raises:
+        -------
+            SchemaError: a declared column is missing or can't be cast.
+        """
+        fields = [f for f in self.schema if columns is None or f.name in columns]
+
+        missing = [f.name for f in fields if f.name not in table.column_names]
+        if missing:
+            raise SchemaError(f"{self.name}: missing columns {missing}")
+
+        arrays = []
+        for field in fields:
+            col = table[field.name]
+            try:
+                if col.type == field.type:
+                    pass
+                elif pa.types.is_null(col.type) or len(col) == 0:
+                    col = pa.chunked_array([pa.nulls(len(col), field.type)])
+                elif pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(col.type):
+                    col = pc.dictionary_encode(col.cast(field.type.value_type)).cast(field.type)
+                else:
+                    col = col.cast(field.type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as err:
+                raise SchemaError(f"{self.name}: column {field.name} of type {col.type} isn't {field.type}: {err}")
+            arrays.append(col)
+
+        table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+        if self.sort_by and columns is None:
+            table = table.take(pc.sort_indices(table, sort_keys=[(c, "ascending") for c in self.sort_by]))
+
+        return table
+
+
+# declarations by query function name
+_REGISTRY = {}
+
+
+def register(name, fields, sort_by=(), partition_key="id"):
+    """
+    Declares the cached results of query 'name'.
+
+    Args:
+    -----
+        name (str): name of the query function.
+        fields (list[tuple[str, pa.DataType]]): cached columns and their types.
+        sort_by (list[str]): columns a repo's rows are sorted by.
+        partition_key (str): column holding the repo_id.
+
+    Returns:
+    --------
+        QuerySchema: the declaration
+    """
+    query_schema = QuerySchema(name, pa.schema(fields), sort_by=sort_by, partition_key=partition_key)
+    _REGISTRY[name] = query_schema
+    return query_schema
+
+
+def get_query_schema(func):
+    """
+    Declared results of a query.
+
+    Args:
+    -----
+        func (function): query function.
+
+    Returns:
+    --------
+        QuerySchema | None: declaration, None if the query hasn't declared its results.
+    """
+    return _REGISTRY.get(func.__name__)
+
+
+# commits, cached without the repo_id
+register(
+    "commits_query",
+    [
+        ("commits", pa.string()),  # commit hash
+        ("author_email", CATEGORY),
+        ("date", pa.string()),  # author date as recorded in git
+        ("author_timestamp", TIMESTAMP),  # day the commit was authored
+        ("committer_timestamp", TIMESTAMP),
+    ],
+)
+
+# issues that aren't pull requests, created before today
+register(
+    "issues_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("repo_name", CATEGORY),
+        ("issue", pa.int64()),  # issue_id
+        ("issue_number", pa.int64()),
+        ("gh_issue", pa.int64()),
+        ("created", TIMESTAMP),  # day the issue was opened
+        ("closed", TIMESTAMP),
+    ],
+    sort_by=["created"],
+)
+
+# pull requests created before today
+register(
+    "prs_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("repo_name", CATEGORY),
+        ("pull_request", pa.int64()),  # pull_request_id
+        ("pr_src_number", pa.int64()),
+        ("created", TIMESTAMP),  # day the pull request was opened
+        ("closed", TIMESTAMP),
+        ("merged", TIMESTAMP),
+    ],
+    sort_by=["created"],
+)
+
+# contributor actions, with the contributor's company and alias emails, cached without the repo_id
+register(
+    "company_query",
+    [
+        ("cntrb_id", CATEGORY),  # first 15 characters of the contributor's id
+        ("created", TIMESTAMP),  # day of the action
+        ("login", CATEGORY),
+        ("action", CATEGORY),
+        ("rank", pa.int64()),  # 1 for the contributor's latest action in the repo
+        ("cntrb_company", CATEGORY),
+        ("email_list", CATEGORY),  # alias emails, ' , ' separated
+    ],
+    sort_by=["created"],
+)
+
+# contributor actions
+register(
+    "contributors_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("repo_name", CATEGORY),
+        ("cntrb_id", CATEGORY),  # first 15 characters of the contributor's id
+        ("created_at", TIMESTAMP),  # day of the action
+        ("login", CATEGORY),
+        ("Action", CATEGORY),  # e.g. 'Commit', 'PR Opened', 'Issue Comment'
+        ("rank", pa.int64()),  # 1 for the contributor's latest action in the repo
+    ],
+)
+
+# messages in response to pull requests, one row without message for pull requests without any
+register(
+    "pr_response_query",
+    [
+        ("pull_request_id", pa.int64()),
+        ("id", pa.int64()),  # repo_id
+        ("cntrb_id", CATEGORY),  # author of the pull request
+        ("msg_timestamp", TIMESTAMP),
+        ("msg_cntrb_id", CATEGORY),  # author of the message
+        ("pr_created_at", TIMESTAMP),  # day the pull request was opened
+        ("pr_closed_at", TIMESTAMP),
+    ],
+)
+
+# published releases
+register(
+    "release_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("repo_name", CATEGORY),
+        ("repo_git", CATEGORY),
+        ("releasedate", TIMESTAMP),  # day the release was published
+    ],
+    sort_by=["releasedate"],
+)
+
+# assignment events of pull requests, one row without event for pull requests without any
+register(
+    "pr_assignee_query",
+    [
+        ("pull_request_id", pa.int64()),
+        ("id", pa.int64()),  # repo_id
+        ("created", TIMESTAMP),  # day the pull request was opened
+        ("closed", TIMESTAMP),
+        ("assign_date", TIMESTAMP),
+        ("assignment_action", CATEGORY),  # 'assigned' or 'unassigned'
+        ("assignee", CATEGORY),  # first 15 characters of the contributor's id
+    ],
+)
+
+# assignment events of issues, one row without event for issues without any
+register(
+    "issue_assignee_query",
+    [
+        ("issue_id", pa.int64()),
+        ("id", pa.int64()),  # repo_id
+        ("created", TIMESTAMP),  # day the issue was opened
+        ("closed", TIMESTAMP),
+        ("assign_date", TIMESTAMP),
+        ("assignment_action", CATEGORY),  # 'assigned' or 'unassigned'
+        ("assignee", CATEGORY),  # first 15 characters of the contributor's id
+    ],
+)
+
+# distinct commits authored per day
+register(
+    "commits_rollup_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("day", TIMESTAMP),
+        ("commits", pa.int64()),
+    ],
+    sort_by=["day"],
+)
+
+# issues closed per day
+register(
+    "issues_rollup_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("day", TIMESTAMP),
+        ("closed", pa.int64()),
+    ],
+    sort_by=["day"],
+)
+
+# days each contributor was active on
+register(
+    "contributors_rollup_query",
+    [
+        ("id", pa.int64()),  # repo_id
+        ("cntrb_id", CATEGORY),  # first 15 characters of the contributor's id
+        ("day", TIMESTAMP),
+        ("latest", pa.bool_()),  # day of the contributor's latest action in the repo
+    ],
+    sort_by=["day"],
+)